@@ -0,0 +1,48 @@
+# Importing necessary libraries
+import numpy as np
+from mesa.time import RandomActivation
+
+
+class EventActivation(RandomActivation):
+    """
+    Scheduler that only runs the step of the households that are active, the other agents are activated every step.
+
+    The bookkeeping of all households (flood depth, damage, taxes, income, insurance and the prospect theory score) is
+    done in bulk by the vectorized HouseholdEngine before the scheduler runs, so a dormant household only misses its
+    decisions. A household is active in a step when something happened that can change its decision (see
+    HouseholdEngine.active): a flood in its zone, a friend that adapted or stopped being adapted, a new implementation
+    that protects it, a change of the media coverage or a move. Two things are checked for all households at the start
+    of the step: a household whose prospect theory score of this step (already calculated by the engine) makes it
+    adapt is active if it did not move, and an adapted household in deep water is active once it is allowed to stop
+    being adapted (more than 4 steps after adapting). So the households that are skipped are the ones for which
+    Households.step would not change anything, apart from offering their location to model.height_locations again
+    (with relocation="height_locations").
+
+    The activated agents are shuffled with the random generator of the model every step, like RandomActivation does.
+    With introduce_inequality and the sequential exchange the dormant households still take money from others on the
+    steps they would do that, the batched exchange is done by the engine for all households.
+    """
+    def step(self):
+        model = self.model
+        engine = model.household_engine
+        households = engine.agents
+        engine.active |= engine.is_adapted & (engine.flood_depth_estimated > 0.5) & (self.steps - engine.step_adapted > 4)
+        engine.active |= ~engine.moved & ~(engine.score_no_action >= engine.score_action) #nan scores adapt, like in decide_if_adapted
+        active = engine.active
+        engine.active = np.zeros(engine.size, dtype=bool) #events in this step activate households in the next step
+
+        if model.introduce_inequality and model.exchange == 'sequential' and self.steps % 5 == 0:
+            dormant = [households[row] for row in np.flatnonzero(~active)]
+            model.random.shuffle(dormant)
+            for household in dormant:
+                household.take_money()
+
+        agents = [households[row] for row in np.flatnonzero(active)]
+        for agent_type, agents_of_type in model.agents_by_type.items():
+            if agent_type != "household":
+                agents.extend(agents_of_type)
+        model.random.shuffle(agents)
+        for agent in agents:
+            agent.step()
+        self.steps += 1
+        self.time += 1
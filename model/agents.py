@@ -1,13 +1,14 @@
 # Importing necessary libraries
-import random
+import bisect
 from mesa import Agent
 from shapely.geometry import Point
 from shapely import contains_xy
 import numpy as np
 
 # Import functions from functions.py
-from functions import generate_random_location_within_map_domain, get_flood_depth, calculate_basic_flood_damage, prospect_theory_score, risk_score, move, get_low_locations, adapted_because_of_government_implementation, income_normal
-from functions import floodplain_multipolygon
+from functions import generate_random_location_within_map_domain, prospect_theory_score, move, get_low_locations, adapted_because_of_government_implementation
+from functions import geodata
+from engine import EngineColumn
 
 
 # Define the Households agent class
@@ -16,12 +17,29 @@ class Households(Agent): #money
     An agent representing a household in the model.
     Each household has a flood depth attribute which is randomly assigned for demonstration purposes.
     In a real scenario, this would be based on actual geographical data or more complex logic.
+    The attributes below are stored in the columns of the model's HouseholdEngine, the agent is a view on its row.
     """
+    money = EngineColumn()
+    income = EngineColumn()
+    risk_behavior = EngineColumn()
+    insurance_benefit_estimated = EngineColumn()
+    money_lost_because_of_flood_adaptation = EngineColumn()
+    flood_depth_estimated = EngineColumn()
+    flood_damage_estimated = EngineColumn(total="total_flood_damage_estimated")
+    flood_depth_actual = EngineColumn()
+    flood_damage_actual = EngineColumn(total="total_flood_damage_actual")
+    adaptation_number = EngineColumn(int)
+    step_adapted = EngineColumn(int)
+    is_adapted = EngineColumn(bool, total="adapted_count", activate_neighbours=True)
+    is_insured = EngineColumn(bool, total="insured_count", neighbours="neighbours_insured")
+    moved = EngineColumn(bool)
 
-    def __init__(self, unique_id, model, adaptation_threshold, income_mean, insurance_price, insurance):
+    def __init__(self, unique_id, model, adaptation_threshold, income_mean, insurance_price, insurance, location=None):
         super().__init__(unique_id, model)
+        self.engine = model.household_engine
+        self.row = self.engine.add(self)
         self.is_adapted = False  # Initial adaptation status set to False
-        self.risk_behavior = risk_score() #this would be nice as a normal curve
+        # the risk behavior, money, income and estimated insurance benefit were drawn for all households by the engine (see HouseholdEngine.draw_initial_values)
         self.type = "household"
         self.adaptation_threshold = adaptation_threshold 
         self.moved = False
@@ -30,64 +48,77 @@ class Households(Agent): #money
         self.money_lost_because_of_flood_adaptation = 0
         self.is_insured = False
         self.income_mean = income_mean
-        self.money = income_normal(46000)
+        self.adaptation_posibilites = self.engine.adaptation_posibilites
         self.current_adaptation = "None"
-        self.insurance_benefit_estimated = np.random.randint(100, 5000)
         self.step_adapted = 0
-        self.adaptation_posibilites = ["None", "SandBags", "IntenseBarricading", "Move", "GovernmentBased"]
-        self.adaptation_number = 0
         # getting flood map values
-        # Get a random location on the map
-        loc_x, loc_y = generate_random_location_within_map_domain()
-        self.location = Point(loc_x, loc_y)
-        self.income = income_normal(self.income_mean)
+        # Get a random location on the map, the model draws the locations of all households at once
+        if location is None:
+            loc_x, loc_y = generate_random_location_within_map_domain(rng=model.streams.locations)
+            location = Point(loc_x, loc_y)
+        self.location = location
 
         # Check whether the location is within floodplain
         self.in_floodplain = False
-        if contains_xy(geom=floodplain_multipolygon, x=self.location.x, y=self.location.y):
+        if contains_xy(geom=geodata.floodplain_multipolygon, x=self.location.x, y=self.location.y):
             self.in_floodplain = True
         
-        # Get the estimated flood depth at those coordinates. 
-        # the estimated flood depth is calculated based on the flood map (i.e., past data) so this is not the actual flood depth
-        # Flood depth can be negative if the location is at a high elevation
-        self.flood_depth_estimated = get_flood_depth(corresponding_map=model.flood_map, location=self.location, band=model.band_flood_img)
-        # handle negative values of flood depth
-        if self.flood_depth_estimated < 0:
-            self.flood_depth_estimated = 0
-        
-        # calculate the estimated flood damage given the estimated flood depth. Flood damage is a factor between 0 and 1
-        self.flood_damage_estimated = calculate_basic_flood_damage(self, flood_depth=self.flood_depth_estimated)
+        # The estimated flood depth is calculated based on the flood map (i.e., past data) so this is not the actual flood depth
+        # The model looks up the estimated flood depth and damage for all households at once when they are all placed (see FloodDepthCache)
+        self.flood_depth_estimated = 0
+        self.flood_damage_estimated = 0
 
         # Add an attribute for the actual flood depth. This is set to zero at the beginning of the simulation since there is not flood yet
         # and will update its value when there is a shock (i.e., actual flood). Shock happens at some point during the simulation
         self.flood_depth_actual = 0
         
         #calculate the actual flood damage given the actual flood depth. Flood damage is a factor between 0 and 1
-        self.flood_damage_actual = calculate_basic_flood_damage(self, flood_depth=self.flood_depth_actual)
+        self.flood_damage_actual = self.model.damage_curve.damage_one(self.flood_depth_actual, self.adaptation_number)
+
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, point):
+        self._location = point
+        self.engine.x[self.row] = point.x
+        self.engine.y[self.row] = point.y
+        self.engine.active[self.row] = True #a household that moved decides again in the next step
+
+    @property
+    def current_adaptation(self):
+        return self.adaptation_posibilites[self.adaptation_number]
+
+    @current_adaptation.setter
+    def current_adaptation(self, adaptation):
+        self.adaptation_number = self.adaptation_posibilites.index(adaptation)
     
     # Function to count friends who can be influencial.
     def count_friends(self, radius):
         """Count the number of neighbors within a given radius (number of edges away). This is social relation and not spatial"""
+        if radius == 1:
+            return int(self.engine.degree[self.row]) #the network does not change so the engine counted the friends once
         friends = self.model.grid.get_neighborhood(self.pos, include_center=False, radius=radius)
         return len(friends)
     
     #here we can count how many of the friends are adapted.
     def count_friends_adapted(self, radius):
-        """Function that counts the number of friends that have been adapted yes/nos"""
-    
-        friends = self.model.grid.get_neighbors(self.pos)
-        friends_adapted = []
-        for i in friends:
-            if i.is_adapted:
-                friends_adapted.append(i)
-        return friends
+        """
+        Function that counts the number of friends that have been adapted yes/nos
+        This has always returned all friends and the prospect theory score is calibrated on that, so it still counts all friends.
+        """
+        return int(self.engine.degree[self.row])
 
     def take_money(self):
         """Function that takes money from other agents based on chance where the richer agent has a bigger chance to win"""
-        other_agent = random.sample(self.model.schedule.agents, 1)[0]
-        if other_agent != self and other_agent.type == "household":
-            chance_self = random.random()
-            chance_i = random.random()
+        # the other agent and the chances were drawn for all households at the start of the step by the engine
+        index = self.engine.take_money_partner[self.row]
+        households = self.model.agents_by_type["household"]
+        if index < len(households) and households[index] != self: #households were added to the schedule first
+            other_agent = households[index]
+            chance_self = self.engine.take_money_chance_self[self.row]
+            chance_i = self.engine.take_money_chance_other[self.row]
             current_agent_score = (self.money * chance_self)/3
             other_agent_score = (other_agent.money * chance_i)/3
 
@@ -105,9 +136,8 @@ class Households(Agent): #money
     def decide_if_adapted(self, prospect_score):
         """Function that decides if an agent gets adapted yes or no. This is based on the prospect theory score, first element of the list is the score for action and the second the score against acrion"""
         if self.model.schedule.steps % 10 == 0 and self.model.logging: #give an update every 10 steps
-            f = open("logs/logs.txt", "a")
-            f.write(f"[Step: {self.model.schedule.steps}] Agent: {self.unique_id} The scores are risk:{self.risk_behavior}, prospect_score: {prospect_score} and flood_damage est:{self.flood_damage_estimated} \n")
-            f.close()
+            self.model.run_log.record("debug", "household_scores", self.model.schedule.steps, agent=self.unique_id, risk=self.risk_behavior,
+                                      prospect_score=prospect_score, flood_damage_estimated=self.flood_damage_estimated)
                 
         if prospect_score[0] >= prospect_score[1]:
             return False
@@ -116,18 +146,14 @@ class Households(Agent): #money
     
     def pay_taxes(self):
         "Function that describes how the agent pays thair taxes based on the tax system in place. This taxes richer people more than poor people combatting inequaltiy"
-        for agent in self.model.schedule.agents:
-            if agent.type == "government":
-                tax_rate = agent.tax_rates
-                personal_rate = [(income, tax) for income, tax in tax_rate.items() if income <= self.income]
-                personal_rate = personal_rate[-1] #last item should be the tax rate that applies
-                money_owed = personal_rate[1] * self.money #grab the tax and multply by money
-                if self.money - money_owed != 0:
-                    self.money -= money_owed
-                    agent.money += money_owed
-                else:
-                    agent.money += self.money
-                    self.money = 0 
+        for agent in self.model.agents_by_type["government"]:
+            money_owed = agent.tax_rate(self.income) * self.money #grab the tax and multply by money
+            if self.money - money_owed != 0:
+                self.money -= money_owed
+                agent.money += money_owed
+            else:
+                agent.money += self.money
+                self.money = 0 
     
     def pay_insurance_risk_based(self, insurance_agent):
         "Pay the insurance based on how the risk behavior of the household is"
@@ -145,16 +171,11 @@ class Households(Agent): #money
     def decide_on_insurance(self):
         "Households decide if they want to be insured yes/no based on risks and friends that are adapted"
         estimated_flood_damage = self.flood_damage_estimated
-        neigbors = self.model.grid.get_neighbors(self.pos)
-        neigbors_insured = 0
+        neigbors_insured = self.engine.neighbours_insured[self.row] #kept up to date by the engine when a household changes
         social_score = 0
 
-        for i in neigbors:
-            if i.is_insured:
-                neigbors_insured += 1
-
         if neigbors_insured != 0:
-            social_score = neigbors_insured/len(neigbors)
+            social_score = neigbors_insured/self.engine.degree[self.row]
 
         if social_score > 0.5:
             return True
@@ -165,13 +186,13 @@ class Households(Agent): #money
     def decide_adapting_mechanism(self, flood_depth_estimated):
         """Households choose what type of adaption they do where moving is the most aggressive"""
         if flood_depth_estimated <= self.adaptation_threshold:
-            cost = np.random.randint(100, 500)
+            cost = self.engine.sandbags_cost[self.row]
             if self.money - cost >= cost:
                 self.money -= cost
                 self.current_adaptation = self.adaptation_posibilites[1]
                 return self.adaptation_posibilites[1]
         elif flood_depth_estimated <= self.adaptation_threshold*1.3:
-            cost = np.random.randint(500, 2000)
+            cost = self.engine.barricading_cost[self.row]
             if self.money - cost >= self.money:
                 self.money -= cost
                 self.current_adaptation = self.adaptation_posibilites[2]
@@ -189,36 +210,46 @@ class Households(Agent): #money
         If the flood dept still is very high they will be not adapted any more but there is a deley of 4 steps in before they are able to move again. 
         
         Now we can use the municipality to create better this process 
+
+        In the vectorized mode the flood depth, damage, taxes, income, insurance and prospect theory score were already
+        updated for all households by the HouseholdEngine, so only the decisions are made here.
         """
-    
-        self.flood_depth_estimated = get_flood_depth(corresponding_map=self.model.flood_map, location=self.location, band=self.model.band_flood_img)
-        if self.flood_depth_estimated < 0:
-            self.flood_depth_estimated = 0
-        
-        # calculate the estimated flood damage given the estimated flood depth. Flood damage is a factor between 0 and 1
-        self.flood_damage_estimated = calculate_basic_flood_damage(self, flood_depth=self.flood_depth_estimated)
-        self.flood_damage_actual = calculate_basic_flood_damage(self, flood_depth=self.flood_depth_actual)
-        
-        self.pay_taxes() #first pay tax
-        self.earn_money() #than earn money
-        if self.model.schedule.steps %5 == 0 or self.model.schedule.steps == 0 and self.is_adapted == False: #decide if agent wants insurance do not get insurance if already adapted
-            if self.insurance:
-                self.is_insured = self.decide_on_insurance() #decide if the agent wants an insurance
-            if self.model.introduce_inequality:
+        if self.engine.vectorized:
+            if self.model.introduce_inequality and self.model.exchange == 'sequential' and (self.model.schedule.steps %5 == 0 or self.model.schedule.steps == 0 and self.is_adapted == False):
                 self.take_money() #inspired by simple economy agents can also take money from other agents
-        if self.flood_depth_estimated < 0.025:
-            self.model.height_locations.append(self.location)
-        
-        #Pay for insurance each step
-        if self.is_insured:
-            self.pay_insurance_risk_based(self.model.insurance_agent)
-        
-        friends_adapted = self.count_friends_adapted(radius=1)
-        probabilty_flood = 0.1 #probability of a flood is about 0.1 now
-        cost_of_adapting_estimate = np.random.randint(100,5000) #based on adapting mechanism that h
-        prospect_score = prospect_theory_score(agent=self, probability_of_flood=probabilty_flood, friends_adapted=friends_adapted, risk_behavior=self.risk_behavior, number_of_households=self.model.number_of_households, media_coverage=self.model.media_coverage/2, flood_damage_estimated= self.flood_damage_estimated, cost_of_adapting=cost_of_adapting_estimate)
+            if self.flood_depth_estimated < 0.025 and self.model.relocation == 'height_locations':
+                self.model.height_locations.add(self.model.depth_cache.cell(self.row), self.engine.x[self.row], self.engine.y[self.row])
+            prospect_score = self.engine.prospect_score(self.row)
+        else:
+            self.flood_depth_estimated = self.model.depth_cache.get_depth(self.row, self.engine.x[self.row], self.engine.y[self.row]) #only looked up on the map if the household moved
+            if self.flood_depth_estimated < 0:
+                self.flood_depth_estimated = 0
+            
+            # calculate the estimated flood damage given the estimated flood depth. Flood damage is a factor between 0 and 1
+            self.flood_damage_estimated = self.model.damage_curve.damage_one(self.flood_depth_estimated, self.adaptation_number)
+            self.flood_damage_actual = self.model.damage_curve.damage_one(self.flood_depth_actual, self.adaptation_number)
+            
+            self.pay_taxes() #first pay tax
+            self.earn_money() #than earn money
+            if self.model.schedule.steps %5 == 0 or self.model.schedule.steps == 0 and self.is_adapted == False: #decide if agent wants insurance do not get insurance if already adapted
+                if self.insurance:
+                    self.is_insured = self.decide_on_insurance() #decide if the agent wants an insurance
+                if self.model.introduce_inequality and self.model.exchange == 'sequential':
+                    self.take_money() #inspired by simple economy agents can also take money from other agents
+            if self.flood_depth_estimated < 0.025 and self.model.relocation == 'height_locations':
+                self.model.height_locations.add(self.model.depth_cache.cell(self.row), self.engine.x[self.row], self.engine.y[self.row])
+            
+            #Pay for insurance each step
+            if self.is_insured:
+                self.pay_insurance_risk_based(self.model.insurance_agent)
+            
+            friends_adapted = self.count_friends_adapted(radius=1)
+            probabilty_flood = 0.1 #probability of a flood is about 0.1 now
+            engine = self.engine #the random numbers for this step are drawn by the engine for all households
+            prospect_score = prospect_theory_score(agent=self, probability_of_flood=probabilty_flood, friends_adapted=friends_adapted, risk_behavior=self.risk_behavior, number_of_households=self.model.number_of_households, media_coverage=self.model.media_coverage/2, flood_damage_estimated= self.flood_damage_estimated, cost_of_adapting=engine.cost_of_adapting_estimate[self.row],
+                                                   lambda_eq=engine.lambda_eq[self.row], theta=engine.theta[self.row], delta=engine.delta[self.row])
         #here we should say that if a household is close to a government implementation they are automatically adapted and nothing else realy matters past that point 
-        if adapted_because_of_government_implementation(implementation_agents=self.model.implementation_agents, agent=self):
+        if adapted_because_of_government_implementation(implementation_index=self.model.implementation_index, agent=self):
             self.is_adapted = True
             self.current_adaptation = "GovernmentBased"
         elif self.decide_if_adapted(prospect_score) and self.moved == False: #takes two more from self.
@@ -226,12 +257,17 @@ class Households(Agent): #money
             self.is_adapted = True  # Agent adapts to flooding so it moves to a higher area  Maybe only move if that is tha last resort
             self.step_adapted = self.model.schedule.steps
             if adaptation_mechanism == "Move":
-                if self.model.height_locations:
-                    location = self.model.height_locations[random.randint(0, len(self.model.height_locations)-1)]
-                    x = location.x
-                    y = location.y 
-                    x,y = move(x,y) #move to a new location that is higher and close to other high living neighborhoods
-                    cost_of_moving = random.randint(1000,5000) 
+                if self.model.relocation == 'depth_index':
+                    # a dry cell on the flood map close to home, dry like the locations households offer to height_locations
+                    location = self.model.depth_index.sample_near_below(self.engine.x[self.row], self.engine.y[self.row], self.model.relocation_radius, 0.025, self.model.streams.moves)
+                elif self.model.height_locations:
+                    x, y = self.model.height_locations.sample()
+                    location = move(x,y, rng=self.model.streams.moves) #move to a new location that is higher and close to other high living neighborhoods
+                else:
+                    location = None
+                if location is not None:
+                    x, y = location
+                    cost_of_moving = self.engine.cost_of_moving[self.row]
                     if cost_of_moving <= self.money:
                         self.money -= cost_of_moving#if they move it will cost between 1000 and 5000
                         self.money_lost_because_of_flood_adaptation += cost_of_moving
@@ -241,7 +277,7 @@ class Households(Agent): #money
                         self.money = 0
                     self.location = Point(x, y)
                 else:
-                    x, y = generate_random_location_within_map_domain() #agent moves to a different spot where he is adapted, idealy this would be to a higher location but I don't know how to do this
+                    x, y = generate_random_location_within_map_domain(rng=self.model.streams.moves) #agent moves to a different spot where he is adapted, idealy this would be to a higher location but I don't know how to do this
                     self.location = Point(x, y)
                 self.moved = True
         elif self.flood_depth_estimated > 0.5 and self.model.schedule.steps - self.step_adapted > 4: #when the flood depth in theory can be higher than the actor is no longer adapted, value based on function calculate basic flood damage
@@ -255,6 +291,14 @@ class Government(Agent):
     - regulations
     - finances
     """
+    tax_rates = {
+        0: 0,
+        2000: 0.1,
+        5000: 0.15,
+        10000: 0.2,
+        50000: 0.25
+    }
+
     def __init__(self, unique_id, model, money, implementations):
         super().__init__(unique_id, model)
         self.type = 'government'
@@ -262,56 +306,57 @@ class Government(Agent):
         self.policy = None
         self.implementations = implementations
         self.amount_of_policies = 0
-        self.tax_rates = {
-            0: 0,
-            2000: 0.1,
-            5000: 0.15,
-            10000: 0.2,
-            50000: 0.25
-        }
-        self.low_locations = get_low_locations(sample_size=100, corresponding_map=model.flood_map, band=model.band_flood_img, arrey_length=20)
-    
-    def list_adapted(self, agents):
-        """This function makes a list of all agents that have already been adapted"""
-        adapted = []
-        for a in agents:
-            if a.is_adapted:
-                adapted.append(a)
-        return adapted
+        # sorted lower bounds of the brackets and their rates so the bracket of an income can be searched
+        self.tax_brackets = sorted(self.tax_rates)
+        self.tax_bracket_rates = np.array([self.tax_rates[income] for income in self.tax_brackets])
+        self.model.government_agent = self
+        # the 20 lowest of 100 random locations are the places for the implementations, with the depth index if the model uses it
+        if model.relocation == 'depth_index':
+            low_x, low_y = model.depth_index.lowest_of_sample(sample_size=100, number=20, rng=model.streams.government)
+        else:
+            low_x, low_y = get_low_locations(sample_size=100, corresponding_map=model.flood_map, band=model.band_flood_img, arrey_length=20, rng=model.streams.government)
+        self.low_locations = [Point(x, y) for x, y in zip(low_x, low_y)]
     
+    def tax_rate(self, income):
+        """The tax rate of the highest bracket that starts at or below the income"""
+        return self.tax_bracket_rates[bisect.bisect_right(self.tax_brackets, income) - 1]
+
+    def collect_taxes(self, households):
+        """Charge the taxes of all households in one go, households is the HouseholdEngine. Same rules as Households.pay_taxes"""
+        bracket = np.searchsorted(self.tax_brackets, households.income, side='right') - 1
+        money_owed = self.tax_bracket_rates[bracket] * households.money
+        households.money -= money_owed
+        self.money += money_owed.sum()
+
     def count_friends(self, radius): #has to be here because of the lambda function in the model, easiest fix is to just put it here
         pass
 
-    def expected_damage(self, households):
-        """Here the total avarage damages of all households in theory is taken"""
-        total = 0
-        for agent in households:
-            total += agent.flood_damage_estimated
+    def expected_damage(self, number_of_households):
+        """Here the total avarage damages of all households in theory is taken, the total is kept up to date by the household engine"""
+        total = self.model.household_engine.total_flood_damage_estimated
         
         if total != 0:
-            return total/len(households)
+            return total/number_of_households
         else:
             return 0
     
-    def actual_damage(self, households):
+    def actual_damage(self, number_of_households):
         """Here the actual avarage damage is calculated"""
-        total = 0
-        for agent in households:
-            total += agent.flood_damage_actual
+        total = self.model.household_engine.total_flood_damage_actual
         
         if total != 0:
-            return total/len(households)
+            return total/number_of_households
         else:
             return 0
     
-    def decide_policy(self, households, adapted_households, money_available):
+    def decide_policy(self, number_of_households, number_of_adapted_households, money_available):
         """Depending on the severity of the flooding and the adaptation level of the households a policy is chosen from the list below"""
         policies = ['None', 'Dikes', 'Water locks']
         policy = 'None'
-        ratio_adapted = len(adapted_households)/len(households)
+        ratio_adapted = number_of_adapted_households/number_of_households
         ratio_adapted = 1 - ratio_adapted
-        expected_damage = self.expected_damage(households=households)
-        actual_damage = self.actual_damage(households=households)
+        expected_damage = self.expected_damage(number_of_households=number_of_households)
+        actual_damage = self.actual_damage(number_of_households=number_of_households)
 
         policy_number = (ratio_adapted + expected_damage + actual_damage)/3
         if 0.4 <= policy_number <= 0.5 and money_available > 1000000: #check how expensive dikes are
@@ -328,7 +373,7 @@ class Government(Agent):
 
     def spend_on_other_expenses(self):
         """The government has other expenses for sources refer to the notebook"""
-        expense = random.randint(17000, 20000) * self.model.number_of_households
+        expense = int(self.model.streams.government.integers(17000, 20001)) * self.model.number_of_households
         if self.money >= expense:
             self.money -= expense
         else:
@@ -336,27 +381,25 @@ class Government(Agent):
     
     def generate_other_incomes(self):
         """The government has other incomes than taxes for sources refer to the notebook"""
-        incomes = random.randint(150000, 500000) 
+        incomes = int(self.model.streams.government.integers(150000, 500001))
         self.money += incomes
 
     def step(self):
         """Behavior of the government agent during a model step"""
-        agents = self.model.schedule.agents
-        households = [ agent for agent in agents if agent.type == "household" ] #here there is one empty agent in the list
-        adapted_households = self.list_adapted(households)
-        #amount_adapted = len(adapted_households) #amount of households already adapted 
+        engine = self.model.household_engine #keeps count of the adapted households
         self.spend_on_other_expenses() #need to spend money on other things as well
         self.generate_other_incomes() #things like business taxes and among other things
         
         #If the flood damage is high and there are little households adaptd #check the policy every 5 steps and 
         if self.model.schedule.steps % 5 == 0 and self.implementations:
-            self.policy = self.decide_policy(households=households, adapted_households=adapted_households, money_available=self.money)
+            self.policy = self.decide_policy(number_of_households=len(self.model.agents_by_type["household"]), number_of_adapted_households=engine.adapted_count, money_available=self.money)
             # Implement the policy so add the implementation to the schedule
             if self.policy != "None" and self.amount_of_policies<=10:
                 self.amount_of_policies += 1
                 implementation = Government_policy_implementation(unique_id=self.unique_id+1 + self.amount_of_policies , model=self.model, position=self.low_locations[self.amount_of_policies], policy=self.policy)
-                self.model.implementation_agents.append(implementation)
-                self.model.schedule.add(implementation)
+                self.model.add_agent(implementation) #also puts it in model.implementation_agents
+                protected = self.model.implementation_index.add(implementation)
+                engine.active[protected] = True #the households it protects become adapted in the next step
 
 # More agent classes can be added here, e.g. for insurance agents.
 class Media(Agent):
@@ -375,26 +418,26 @@ class Media(Agent):
             2: "Big coverage"
         }
         self.coverage = 1
+        self.fixed_coverage = None #coverage of a scenario (see AdaptationModel.set_scenario), used instead of the flood damage
     
     def count_friends(self, radius): #has to be here because of the lamda function in the model 
         pass
 
-    def average_flood_damage(self, agents):
-        """Determine what the avarage flood damage is"""
-        damage = 0
-        for a in agents:
-            damage += a.flood_damage_actual
+    def average_flood_damage(self):
+        """Determine what the avarage flood damage is, the total is kept up to date by the household engine"""
+        damage = self.model.household_engine.total_flood_damage_actual
         if damage != 0:
             return damage/self.model.number_of_households
         else:
             return 0
 
     def step(self):
-        agents = self.model.schedule.agents
-        households = [ agent for agent in agents if agent.type == "household" ] #here there is one empty agent in the list
-        average_damage = self.average_flood_damage(households)
+        average_damage = self.average_flood_damage()
 
-        if average_damage < 0.2: #later we can base these numbers on sources. 
+        if self.fixed_coverage is not None:
+            self.coverage = self.fixed_coverage
+            self.model.set_media_attention(self.fixed_coverage)
+        elif average_damage < 0.2: #later we can base these numbers on sources. 
             self.coverage = 0
             self.model.set_media_attention(0)
         elif average_damage < 0.5:
@@ -404,9 +447,8 @@ class Media(Agent):
             self.coverage = 2
             self.model.set_media_attention(2)
         if self.model.schedule.steps % 10 == 0 and self.model.logging: #give an update every 10 steps
-            f = open("logs/logs.txt", "a")
-            f.write(f"Step: {self.model.schedule.steps} Agent: Media their average damage is {average_damage} and the coverage {self.coverage_types[self.coverage]}\n")
-            f.close()
+            self.model.run_log.record("info", "media_coverage", self.model.schedule.steps, average_damage=average_damage,
+                                      coverage=self.coverage_types[self.coverage])
     
 class Government_policy_implementation(Agent):
     """The reason this is an Agent is because it needs to get a position on the map, the esiest way to do this is to make it an agent"""
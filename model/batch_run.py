@@ -0,0 +1,189 @@
+# Importing necessary libraries
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import rasterio as rs
+
+from model import AdaptationModel
+from checkpoint import checkpoint, restore
+from collector import ColumnarCollector
+from functions import geodata, load_rain_data
+from raster import load_flood_band
+
+
+def parameter_grid(parameters):
+    """All combinations of the parameter values, parameters is a dict with a list of values for every AdaptationModel argument"""
+    names = sorted(parameters)
+    for values in itertools.product(*(parameters[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def run_key(params, seed):
+    """Key of one run, the same parameters and seed always give the same key"""
+    return json.dumps({"params": params, "seed": seed}, sort_keys=True)
+
+
+def run_file_name(key):
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def completed_runs(output_dir):
+    """Keys of the runs in the index of output_dir, a line that was not written completely is skipped"""
+    keys = set()
+    index_path = os.path.join(output_dir, "completed.jsonl")
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            for line in f:
+                try:
+                    keys.add(json.loads(line)["key"])
+                except (json.JSONDecodeError, KeyError):
+                    continue
+    return keys
+
+
+def preload_inputs(flood_map_choices):
+    """Load everything that is the same for all runs once per worker: the geodata, the rain data and the flood maps"""
+    geodata.map_domain_polygon
+    geodata.floodplain_multipolygon
+    load_rain_data()
+    for choice in flood_map_choices:
+        with rs.open(AdaptationModel.flood_map_paths[choice]) as flood_map:
+            load_flood_band(flood_map)
+
+
+def write_model_data(model, output_dir, name):
+    """
+    Write the model and agent data of a finished run to output_dir, returns the names of the files (in output_dir).
+    With columnar_output the data was already streamed to the directory name in output_dir during the run, then only
+    the last chunks and the model data are written.
+    """
+    if isinstance(model.datacollector, ColumnarCollector):
+        model.datacollector.close()
+        return sorted(os.path.join(name, file) for file in os.listdir(os.path.join(output_dir, name)))
+    model.datacollector.get_model_vars_dataframe().to_pickle(os.path.join(output_dir, f"{name}_model.pkl"))
+    model.datacollector.get_agent_vars_dataframe().to_pickle(os.path.join(output_dir, f"{name}_agents.pkl"))
+    return [f"{name}_model.pkl", f"{name}_agents.pkl"]
+
+
+def run_model(params, seed, number_of_steps, output_dir):
+    """Run one model and write its model and agent data to output_dir, returns the name the files start with and the files.
+    All random numbers of the model come from its seed (see RandomStreams), so nothing global has to be seeded.
+    With columnar_output in params (any value that is not None) the data of the run is streamed to its own directory in output_dir."""
+    name = run_file_name(run_key(params, seed))
+    model_params = dict(params)
+    number_of_steps = model_params.pop("number_of_steps", number_of_steps) #number_of_steps can also be one of the varied parameters
+    if model_params.get("columnar_output") is not None:
+        model_params["columnar_output"] = os.path.join(output_dir, name)
+    model = AdaptationModel(seed=seed, number_of_steps=number_of_steps, **model_params)
+    for _ in range(number_of_steps):
+        model.step()
+    model.close()
+    return name, write_model_data(model, output_dir, name)
+
+
+def run_sweep(parameters, seeds, output_dir, number_of_steps=20, max_workers=None):
+    """
+    Run AdaptationModel for every combination of parameters and every seed, spread over processes.
+
+    Parameters
+    ----------
+    parameters: dict with a list of values for every AdaptationModel argument that is varied, e.g. {"network": ["erdos_renyi", "no_network"]}.
+        A columnar_output that is not None streams the data of every run to its own directory in output_dir
+    seeds: list of seeds, every combination of parameters is run with every seed
+    output_dir: the data of every run is written here as soon as it finishes, together with an index (completed.jsonl)
+    number_of_steps: number of steps of every run, unless number_of_steps is one of the parameters
+    max_workers: number of processes, all cores if None
+
+    Returns
+    -------
+    number of runs that were done, runs that are already in the index of output_dir are skipped so a sweep that was
+    interrupted can be started again with the same arguments
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    done = completed_runs(output_dir)
+    runs = [(params, seed) for params in parameter_grid(parameters) for seed in seeds if run_key(params, seed) not in done]
+    if not runs:
+        return 0
+    flood_map_choices = parameters.get("flood_map_choice", ["harvey"])
+
+    failed = []
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=preload_inputs, initargs=(flood_map_choices,)) as executor:
+        futures = {executor.submit(run_model, params, seed, number_of_steps, output_dir): (params, seed) for params, seed in runs}
+        with open(os.path.join(output_dir, "completed.jsonl"), "a") as index:
+            for future in as_completed(futures):
+                params, seed = futures[future]
+                if future.exception() is not None: #the other runs go on, the failed ones are tried again next time
+                    failed.append((params, seed, future.exception()))
+                    continue
+                name, files = future.result()
+                index.write(json.dumps({"key": run_key(params, seed), "params": params, "seed": seed, "file": name, "files": files}) + "\n")
+                index.flush()
+    if failed:
+        params, seed, error = failed[0]
+        raise RuntimeError(f"{len(failed)} of {len(runs)} runs failed, the first one with parameters {params} and seed {seed}") from error
+    return len(runs)
+
+
+def scenario_key(checkpoint_data, scenario):
+    """Key of one scenario of a checkpoint, the same scenario of another checkpoint gets another key"""
+    return json.dumps({"checkpoint": hashlib.sha1(checkpoint_data).hexdigest(), "scenario": scenario}, sort_keys=True)
+
+
+def run_scenario(checkpoint_data, scenario, output_dir):
+    """
+    Restore a checkpoint, change it to the scenario and run it to its last step, the data is written like run_model.
+    Returns the name the files start with and the files. A model with columnar_output copies the files written before
+    the checkpoint to its own directory in output_dir and streams the rest of its data there.
+    """
+    name = run_file_name(scenario_key(checkpoint_data, scenario))
+    model = restore(checkpoint_data)
+    model.set_scenario(**scenario)
+    if isinstance(model.datacollector, ColumnarCollector):
+        model.datacollector.move_to(os.path.join(output_dir, name))
+    while model.schedule.steps < model.number_of_steps:
+        model.step()
+    model.close()
+    return name, write_model_data(model, output_dir, name)
+
+
+def run_scenarios(model, scenarios, output_dir, max_workers=None):
+    """
+    Run scenarios that all start from the same model, spread over processes (see checkpoint.py).
+    The model is only checkpointed once, every worker restores it instead of building and warming up a model again.
+
+    Parameters
+    ----------
+    model: an AdaptationModel that has run the warm-up steps, or a checkpoint of one
+    scenarios: list with a dict of parameters per scenario, see AdaptationModel.set_scenario
+    output_dir: the data of every scenario is written here, together with an index (scenarios.jsonl). The names of
+        the files depend on the scenario and the checkpoint, so scenarios of other checkpoints can be written to the
+        same output_dir
+    max_workers: number of processes, all cores if None
+
+    Returns
+    -------
+    list with the name the files of every scenario start with. Every scenario is written to the index as soon as it
+    finishes, a scenario that fails does not stop the others and raises a RuntimeError after all of them are done
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_data = model if isinstance(model, bytes) else checkpoint(model)
+    warmed_up = restore(checkpoint_data) if isinstance(model, bytes) else model #for the seed and step of the checkpoint in the index
+    failed = []
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        futures = {executor.submit(run_scenario, checkpoint_data, scenario, output_dir): scenario for scenario in scenarios}
+        with open(os.path.join(output_dir, "scenarios.jsonl"), "a") as index:
+            for future in as_completed(futures):
+                scenario = futures[future]
+                if future.exception() is not None:
+                    failed.append((scenario, future.exception()))
+                    continue
+                name, files = future.result()
+                index.write(json.dumps({"key": scenario_key(checkpoint_data, scenario), "scenario": scenario, "seed": warmed_up.seed,
+                                        "step": warmed_up.schedule.steps, "file": name, "files": files}) + "\n")
+                index.flush()
+    if failed:
+        scenario, error = failed[0]
+        raise RuntimeError(f"{len(failed)} of {len(scenarios)} scenarios failed, the first one is {scenario}") from error
+    return [run_file_name(scenario_key(checkpoint_data, scenario)) for scenario in scenarios]
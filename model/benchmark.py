@@ -0,0 +1,261 @@
+"""
+Benchmark of how AdaptationModel scales with the number of households, the network, the number of zones and the
+inequality and insurance options. For every combination the time to make the model, the time of every step and the
+peak memory are measured and saved as JSON, so the results of two versions of the code can be compared.
+
+The model runs on a small synthetic flood map and synthetic model domain and floodplain polygons (made in data_dir),
+so the benchmark does not need the flood maps or shapefiles. Only the rain data csv of input_data is used.
+Every combination runs in a new process, so the memory of one run does not count for the next one.
+
+Run from the model directory:
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --households 100 1000 --networks watts_strogatz
+    python benchmark.py --compare before.json after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import rasterio as rs
+from rasterio.transform import from_origin
+import shapely
+from shapely.geometry import LineString, Point
+
+from batch_run import parameter_grid
+
+try:
+    import resource #not on windows, then no memory is measured
+except ImportError:
+    resource = None
+
+
+default_grid = {
+    "number_of_households": [100, 1000, 10000, 100000],
+    "network": ["erdos_renyi", "barabasi_albert", "watts_strogatz", "no_network"],
+    "number_of_zones": [1, 4],
+    "introduce_inequality": [False, True],
+    "insurance": [False, True],
+}
+
+# the synthetic flood map: cells x cells cells of cell_size meters in EPSG:26915, around Houston like the real maps
+synthetic_left = 250000.0
+synthetic_top = 3330000.0
+synthetic_cells = 600
+synthetic_cell_size = 100.0
+
+
+def make_synthetic_inputs(data_dir, seed=0):
+    """
+    Write a synthetic flood map and model domain and floodplain polygons to data_dir, if they are not there yet.
+    The flood map has a river on the diagonal, the depth is highest at the river and goes down to below 0 away from it.
+    The model domain is a circle in the middle of the map and the floodplain the part of it within 5 km of the river.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    flood_map_path = os.path.join(data_dir, "synthetic_depth_meters.tif")
+    if os.path.exists(flood_map_path):
+        return
+    extent = synthetic_cells * synthetic_cell_size
+    center_x = synthetic_left + extent / 2
+    center_y = synthetic_top - extent / 2
+
+    x = synthetic_left + (np.arange(synthetic_cells) + 0.5) * synthetic_cell_size
+    y = synthetic_top - (np.arange(synthetic_cells) + 0.5) * synthetic_cell_size
+    xx, yy = np.meshgrid(x, y)
+    distance_to_river = np.abs((xx - center_x) - (yy - center_y)) / np.sqrt(2)
+    rng = np.random.default_rng(seed)
+    depth = 3 * np.exp(-distance_to_river / 4000) - 0.5 + rng.normal(0, 0.1, xx.shape)
+    with rs.open(flood_map_path, "w", driver="GTiff", height=synthetic_cells, width=synthetic_cells, count=1,
+                 dtype="float32", crs="EPSG:26915", transform=from_origin(synthetic_left, synthetic_top, synthetic_cell_size, synthetic_cell_size)) as flood_map:
+        flood_map.write(depth.astype(np.float32), 1)
+
+    map_domain = Point(center_x, center_y).buffer(0.4 * extent)
+    river = LineString([(synthetic_left, synthetic_top - extent), (synthetic_left + extent, synthetic_top)])
+    floodplain = river.buffer(5000).intersection(map_domain)
+    for name, polygon in (("map_domain", map_domain), ("floodplain", floodplain)):
+        with open(os.path.join(data_dir, f"synthetic_{name}.wkb"), "wb") as f:
+            f.write(shapely.to_wkb(polygon))
+
+
+def use_synthetic_inputs(data_dir):
+    """Let the models in this process use the synthetic inputs in data_dir, with flood_map_choice='synthetic'"""
+    from model import AdaptationModel
+    from functions import geodata, load_rain_data
+    from raster import load_flood_band
+
+    polygons = []
+    for name in ("map_domain", "floodplain"):
+        with open(os.path.join(data_dir, f"synthetic_{name}.wkb"), "rb") as f:
+            polygons.append(shapely.from_wkb(f.read()))
+    geodata.use_polygons(*polygons)
+    AdaptationModel.flood_map_paths["synthetic"] = os.path.join(data_dir, "synthetic_depth_meters.tif")
+    # loaded here so it is not part of the time to make the first model
+    load_rain_data()
+    with rs.open(AdaptationModel.flood_map_paths["synthetic"]) as flood_map:
+        load_flood_band(flood_map)
+
+
+def peak_memory_mb():
+    """Highest resident memory of this process so far in MB, None if it can not be measured"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10 #bytes on mac, kilobytes on linux
+
+
+def run_benchmark(params, number_of_steps, seed):
+    """Make and run one model, returns the time to make it, the time of every step and the peak memory"""
+    from model import AdaptationModel
+
+    memory_before = peak_memory_mb()
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings(): #the model prints the floods
+        warnings.simplefilter("ignore")
+        start = time.perf_counter()
+        model = AdaptationModel(seed=seed, number_of_steps=number_of_steps, flood_map_choice="synthetic", **params)
+        init_seconds = time.perf_counter() - start
+        step_seconds = []
+        for _ in range(number_of_steps):
+            start = time.perf_counter()
+            model.step()
+            step_seconds.append(time.perf_counter() - start)
+        model.close()
+    memory_after = peak_memory_mb()
+    return {
+        "params": params,
+        "seed": seed,
+        "number_of_steps": number_of_steps,
+        "init_seconds": init_seconds,
+        "step_seconds": step_seconds,
+        "step_mean_seconds": float(np.mean(step_seconds)),
+        "step_median_seconds": float(np.median(step_seconds)),
+        "number_of_floods": model.number_of_floods,
+        "peak_memory_mb": memory_after,
+        # the memory of python, the imports and the inputs is already in use before the model is made
+        "model_peak_memory_mb": None if memory_after is None else memory_after - memory_before,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(number_of_steps, seed):
+    import mesa
+    return {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "mesa": mesa.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "number_of_steps": number_of_steps,
+        "seed": seed,
+        "synthetic_flood_map": {"left": synthetic_left, "top": synthetic_top, "cells": synthetic_cells, "cell_size": synthetic_cell_size},
+    }
+
+
+def run_suite(output, grid=None, number_of_steps=10, seed=0, data_dir=None):
+    """
+    Run the benchmark for every combination of the grid, one after the other, and write the results to output.
+
+    Parameters
+    ----------
+    output: path of the JSON file, written again after every run so the results so far are kept if the suite is stopped
+    grid: dict with a list of values for every AdaptationModel argument that is varied, default_grid if None
+    number_of_steps: number of steps of every run
+    seed: seed of every run
+    data_dir: directory for the synthetic inputs, a temporary directory if None
+
+    Returns
+    -------
+    dict with the metadata and a list with the result of every run, a run that failed has an "error" instead of times
+    """
+    grid = default_grid if grid is None else grid
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), "abm_benchmark_inputs")
+    make_synthetic_inputs(data_dir)
+    results = {"metadata": metadata(number_of_steps, seed), "results": []}
+    runs = list(parameter_grid(grid))
+    # a new process for every run (max_tasks_per_child=1), the runs are not done in parallel so they do not slow each other down
+    with ProcessPoolExecutor(max_workers=1, max_tasks_per_child=1, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=use_synthetic_inputs, initargs=(data_dir,)) as executor:
+        for i, params in enumerate(runs):
+            try:
+                result = executor.submit(run_benchmark, params, number_of_steps, seed).result()
+                print(f"[{i + 1}/{len(runs)}] {params}: init {result['init_seconds']:.3f} s, "
+                      f"step {result['step_mean_seconds']:.4f} s, peak memory {result['peak_memory_mb']} MB")
+            except Exception as error:
+                result = {"params": params, "seed": seed, "number_of_steps": number_of_steps, "error": repr(error)}
+                print(f"[{i + 1}/{len(runs)}] {params}: failed with {error!r}")
+            results["results"].append(result)
+            with open(output, "w") as f:
+                json.dump(results, f, indent=1)
+    return results
+
+
+def compare(before_path, after_path, threshold=1.2):
+    """
+    Compare two results files run by run. Prints the ratio after/before of the time to make the model, the mean step
+    time and the peak memory of the model, and marks the runs where one of them went up by more than threshold.
+
+    Returns
+    -------
+    list with a dict per run that is in both files
+    """
+    with open(before_path) as f:
+        before = {json.dumps(r["params"], sort_keys=True): r for r in json.load(f)["results"] if "error" not in r}
+    with open(after_path) as f:
+        after = {json.dumps(r["params"], sort_keys=True): r for r in json.load(f)["results"] if "error" not in r}
+    rows = []
+    for key in before:
+        if key not in after:
+            continue
+        row = {"params": before[key]["params"]}
+        for name in ("init_seconds", "step_mean_seconds", "model_peak_memory_mb"):
+            old, new = before[key][name], after[key][name]
+            row[name] = new / old if old and new is not None else None
+        row["regression"] = any(ratio is not None and ratio > threshold for ratio in
+                                (row["init_seconds"], row["step_mean_seconds"], row["model_peak_memory_mb"]))
+        rows.append(row)
+        ratios = ", ".join(f"{name} x{row[name]:.2f}" if row[name] is not None else f"{name} -"
+                           for name in ("init_seconds", "step_mean_seconds", "model_peak_memory_mb"))
+        print(f"{'SLOWER ' if row['regression'] else ''}{row['params']}: {ratios}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of AdaptationModel on synthetic inputs")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--households", type=int, nargs="+", default=default_grid["number_of_households"])
+    parser.add_argument("--networks", nargs="+", default=default_grid["network"])
+    parser.add_argument("--zones", type=int, nargs="+", default=default_grid["number_of_zones"])
+    parser.add_argument("--inequality", type=int, nargs="+", default=[0, 1], help="0 and/or 1 for introduce_inequality")
+    parser.add_argument("--insurance", type=int, nargs="+", default=[0, 1], help="0 and/or 1 for insurance")
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two results files instead of running")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare, threshold=args.threshold)
+    else:
+        run_suite(args.output, grid={"number_of_households": args.households, "network": args.networks,
+                                     "number_of_zones": args.zones, "introduce_inequality": [bool(v) for v in args.inequality],
+                                     "insurance": [bool(v) for v in args.insurance]},
+                  number_of_steps=args.steps, seed=args.seed, data_dir=args.data_dir)
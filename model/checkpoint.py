@@ -0,0 +1,69 @@
+"""
+Checkpoints of a running AdaptationModel, to run the same warm-up once and fork it into many scenarios.
+
+A checkpoint is the pickled model: the households (agents and HouseholdEngine arrays), the network, the random
+number generators, rain_values, water_level, the government implementations, the money of the government and the
+insurance and the data collected so far. The flood map is not in it, a restored model opens the file again and uses
+the band that is already memory mapped in the process (see AdaptationModel.__getstate__), so nothing is read or
+built again. Forks of one checkpoint draw the same random numbers, so differences between scenarios come from the
+scenario and not from chance.
+
+    model = AdaptationModel(seed=1, number_of_steps=40)
+    for _ in range(10):
+        model.step()
+    scenarios = [{"insurance_price": 100}, {"insurance_price": 400}, {"government_implementations": False}]
+    for forked in fork(model, scenarios):
+        for _ in range(forked.number_of_steps - forked.schedule.steps):
+            forked.step()
+"""
+import os
+import pickle
+
+from collector import ColumnarCollector
+
+
+def checkpoint(model):
+    """The state of the model as bytes"""
+    return pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)
+
+def restore(checkpoint_data):
+    """A new model with the state of the checkpoint"""
+    return pickle.loads(checkpoint_data)
+
+def save_checkpoint(model, path):
+    with open(path, "wb") as f:
+        f.write(checkpoint(model))
+
+def load_checkpoint(path):
+    with open(path, "rb") as f:
+        return restore(f.read())
+
+def fork(model, scenarios, output_dirs=None):
+    """
+    A new model for every scenario, all with the state of model at this moment
+
+    Parameters
+    ----------
+    model: an AdaptationModel or a checkpoint of one (bytes)
+    scenarios: list with a dict of parameters per scenario, see AdaptationModel.set_scenario
+    output_dirs: one directory per scenario for models with columnar_output, the files collected so far are copied
+        there and the fork writes its next files there (see ColumnarCollector.move_to). If None every fork gets the
+        directory fork_<number of the scenario> in the directory of the model, so the forks never write over each other
+
+    Returns
+    -------
+    list with a model per scenario
+    """
+    checkpoint_data = model if isinstance(model, bytes) else checkpoint(model)
+    if output_dirs is not None and len(output_dirs) != len(scenarios):
+        raise ValueError(f"Got {len(output_dirs)} output directories for {len(scenarios)} scenarios")
+    forks = []
+    for i, scenario in enumerate(scenarios):
+        forked = restore(checkpoint_data)
+        forked.set_scenario(**scenario)
+        if output_dirs is not None:
+            forked.datacollector.move_to(output_dirs[i])
+        elif isinstance(forked.datacollector, ColumnarCollector):
+            forked.datacollector.move_to(os.path.join(forked.datacollector.output_dir, f"fork_{i}"))
+        forks.append(forked)
+    return forks
@@ -0,0 +1,206 @@
+# Importing necessary libraries
+import glob
+import os
+import shutil
+import numpy as np
+from mesa.datacollection import DataCollector
+
+
+# household data that is collected, name of the column and the column of the HouseholdEngine it comes from
+# Currentadaptation is the index in HouseholdEngine.adaptation_posibilites and the location is stored as x and y
+household_columns = {
+    "FloodDepthEstimated": "flood_depth_estimated",
+    "FloodDamageEstimated": "flood_damage_estimated",
+    "FloodDepthActual": "flood_depth_actual",
+    "FloodDamageActual": "flood_damage_actual",
+    "IsAdapted": "is_adapted",
+    "Currentadaptation": "adaptation_number",
+    "Money": "money",
+    "IsInsured": "is_insured",
+    "FriendsCount": "degree",
+    "x": "x",
+    "y": "y"
+}
+
+
+def default_file_format():
+    """Parquet if pyarrow is installed, otherwise numpy npz files"""
+    try:
+        import pyarrow
+        return "parquet"
+    except ImportError:
+        return "npz"
+
+
+def write_table(path, columns, file_format):
+    """Write a dict of equally long arrays to path (without extension) as parquet, arrow (IPC file) or npz"""
+    if file_format == "npz":
+        np.savez(path + ".npz", **columns)
+        return
+    import pyarrow as pa
+    table = pa.table(columns)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, path + ".parquet")
+    elif file_format == "arrow":
+        with pa.OSFile(path + ".arrow", "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    else:
+        raise ValueError(f"Unknown file format: '{file_format}'. Currently implemented formats are: 'parquet', 'arrow' and 'npz'")
+
+
+class ColumnBuffer:
+    """Preallocated arrays for the household columns that are collected with the same interval"""
+    def __init__(self, names, dtypes, number_of_households, chunk_steps):
+        self.names = names
+        self.steps = np.zeros(chunk_steps, dtype=np.int64)
+        self.values = {name: np.zeros((chunk_steps, number_of_households), dtype=dtypes[name]) for name in names}
+        self.filled = 0
+        self.part = 0
+
+    def full(self):
+        return self.filled == len(self.steps)
+
+
+class PicklableDataCollector(DataCollector):
+    """
+    The Mesa DataCollector, but one that can be pickled with the model (see checkpoint.py). Mesa turns attribute names
+    of agent reporters into functions made inside a function, which pickle can not save, so the reporters are left
+    out and made again from agent_reporter_specs when the collector is unpickled.
+    """
+    def __init__(self, model_reporters=None, agent_reporters=None, tables=None):
+        self.agent_reporter_specs = dict(agent_reporters or {})
+        super().__init__(model_reporters=model_reporters, agent_reporters=agent_reporters, tables=tables)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["agent_reporters"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        for name, reporter in self.agent_reporter_specs.items():
+            self._new_agent_reporter(name, reporter)
+
+
+class ColumnarCollector:
+    """
+    Collects the model data and the household data of every step into preallocated numpy arrays, and writes the household
+    data in chunks of steps to files in output_dir, so the history does not have to be kept in memory.
+
+    The household data is read straight from the columns of the HouseholdEngine (see household_columns). Columns can
+    be collected every few steps with intervals, e.g. {"Money": 5}, the others are collected every step. Columns with
+    the same interval are written together to files named households_every<interval>_<part>, in long format with a
+    Step and AgentID column like the agent data of the Mesa DataCollector. The model data is written to model at close().
+
+    Parameters
+    ----------
+    model: the AdaptationModel
+    output_dir: directory the files are written to
+    model_reporters: dict of name and function of the model that returns one number
+    intervals: dict of column name and the number of steps between two collections
+    chunk_steps: number of collections kept in memory before they are written, if None as many as fit in chunk_bytes
+        (at least one and not more than the run needs)
+    chunk_bytes: memory of the arrays of one interval when chunk_steps is None, 16 MB by default
+    file_format: 'parquet' or 'arrow' (need pyarrow) or 'npz', the default is parquet if pyarrow is installed
+    """
+    def __init__(self, model, output_dir, model_reporters, intervals=None, chunk_steps=None, chunk_bytes=2**24, file_format=None):
+        self.model = model
+        self.output_dir = output_dir
+        self.model_reporters = model_reporters
+        self.file_format = file_format or default_file_format()
+        os.makedirs(output_dir, exist_ok=True)
+
+        engine = model.household_engine
+        self.agent_ids = np.array([agent.unique_id for agent in engine.agents])
+        sources = {name: self.column(column) for name, column in household_columns.items()}
+        dtypes = {name: source.dtype for name, source in sources.items()}
+
+        intervals = intervals or {}
+        groups = {}
+        for name in household_columns:
+            groups.setdefault(intervals.get(name, 1), []).append(name)
+        self.buffers = {}
+        for interval, names in groups.items():
+            steps = chunk_steps
+            if steps is None: #the households times the bytes of one collection of every column decide how many fit
+                step_bytes = engine.size * sum(dtypes[name].itemsize for name in names)
+                steps = min(max(1, chunk_bytes // step_bytes), model.number_of_steps // interval + 1)
+            self.buffers[interval] = ColumnBuffer(names, dtypes, engine.size, steps)
+        self.model_vars = {name: [] for name in model_reporters}
+        self.model_steps = []
+
+    def column(self, column):
+        return getattr(self.model.household_engine, column)
+
+    def collect(self, model):
+        step = model.schedule.steps
+        self.model_steps.append(step)
+        for name, reporter in self.model_reporters.items():
+            self.model_vars[name].append(reporter())
+        for interval, buffer in self.buffers.items():
+            if step % interval != 0:
+                continue
+            buffer.steps[buffer.filled] = step
+            for name in buffer.names:
+                buffer.values[name][buffer.filled] = self.column(household_columns[name])
+            buffer.filled += 1
+            if buffer.full():
+                self.flush(interval)
+
+    def flush(self, interval):
+        """Write the collected steps of one interval to a file and start a new chunk"""
+        buffer = self.buffers[interval]
+        if buffer.filled == 0:
+            return
+        filled = buffer.filled
+        number_of_households = len(self.agent_ids)
+        columns = {"Step": np.repeat(buffer.steps[:filled], number_of_households),
+                   "AgentID": np.tile(self.agent_ids, filled)}
+        for name in buffer.names:
+            columns[name] = buffer.values[name][:filled].ravel()
+        write_table(os.path.join(self.output_dir, f"households_every{interval}_{buffer.part:05d}"), columns, self.file_format)
+        buffer.part += 1
+        buffer.filled = 0
+
+    def move_to(self, output_dir):
+        """
+        Copy the files written so far to output_dir and write the next ones there, for a model forked from a
+        checkpoint (see checkpoint.py) so it does not write over the files of the model it was forked from
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        for interval, buffer in self.buffers.items():
+            for part in range(buffer.part): #only the parts of this model, the other model can have written more since
+                for path in glob.glob(os.path.join(self.output_dir, f"households_every{interval}_{part:05d}.*")):
+                    shutil.copy2(path, output_dir)
+        self.output_dir = output_dir
+
+    def close(self):
+        """Write everything that was not written yet, call this at the end of the run"""
+        for interval in self.buffers:
+            self.flush(interval)
+        columns = {"Step": np.array(self.model_steps, dtype=np.int64)}
+        for name, values in self.model_vars.items():
+            columns[name] = np.asarray(values)
+        write_table(os.path.join(self.output_dir, "model"), columns, self.file_format)
+
+
+def read_table(path):
+    """Read a file written by the ColumnarCollector as a pandas DataFrame"""
+    import pandas as pd
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return pd.DataFrame({name: data[name] for name in data.files})
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    import pyarrow as pa
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def read_household_data(output_dir, interval=1):
+    """All household data of one interval written by the ColumnarCollector, with Step and AgentID as index"""
+    import pandas as pd
+    paths = sorted(glob.glob(os.path.join(output_dir, f"households_every{interval}_*")))
+    return pd.concat([read_table(path) for path in paths], ignore_index=True).set_index(["Step", "AgentID"])
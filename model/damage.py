@@ -0,0 +1,100 @@
+# Importing necessary libraries
+import math
+from abc import ABC, abstractmethod
+import numpy as np
+
+
+# the damage is divided by this factor for the adaptation with this number (the index in HouseholdEngine.adaptation_posibilites)
+# so no adaptation and sand bags leave the damage as it is, intense barricading halves it etc. like in calculate_basic_flood_damage
+adaptation_reduction = np.array([1.0, 1.0, 2.0, 3.0, 4.0])
+
+depth_damage_path = r"../input_data/flood_depth-damage_function.xlsx"
+
+
+class DepthDamageCurve(ABC):
+    """
+    Flood damage (a factor between 0 and 1) as a function of the flood depth in meters, for arrays of depths.
+    flood_depth can have more dimensions than adaptation_number, e.g. the depth of every household for every zone
+    (zones x households) with the adaptation of every household, to get the damage of all of them in one call.
+    """
+    @abstractmethod
+    def damage_factor(self, flood_depth):
+        """Damage factor of every depth in flood_depth, without adaptation"""
+
+    def damage_factor_one(self, flood_depth):
+        return float(self.damage_factor(flood_depth))
+
+    def damage(self, flood_depth, adaptation_number):
+        """Damage of the households with the adaptation reduction of their adaptation number"""
+        return self.damage_factor(flood_depth) / adaptation_reduction[adaptation_number]
+
+    def damage_one(self, flood_depth, adaptation_number):
+        """damage for one household, without numpy arrays because the agents call this one at a time"""
+        return self.damage_factor_one(flood_depth) / adaptation_reduction[adaptation_number]
+
+
+class LogDamageCurve(DepthDamageCurve):
+    """
+    From de Moer, Huizinga (2017) with logarithmic regression over it (see flood_damage.xlsx for function generation),
+    the curve of calculate_basic_flood_damage. Below 0.025m there is no damage, from 6m the damage is 1.
+    """
+    def damage_factor(self, flood_depth):
+        flood_depth = np.asarray(flood_depth, dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(flood_depth >= 6, 1.0, np.where(flood_depth < 0.025, 0.0, 0.1746 * np.log(flood_depth) + 0.6483))
+
+    def damage_factor_one(self, flood_depth):
+        if flood_depth >= 6:
+            return 1.0
+        elif flood_depth < 0.025:
+            return 0.0
+        return 0.1746 * math.log(flood_depth) + 0.6483
+
+
+class TableDamageCurve(DepthDamageCurve):
+    """
+    Damage factors of a table of depths, interpolated linearly between the depths of the table.
+    The interpolation is done once on a dense grid of depths (resolution in meters), after which the damage of a depth
+    is one lookup in that grid. Below the first depth of the table the damage goes linearly to 0 at a depth of 0,
+    above the last depth it stays at the damage of the last depth.
+    """
+    def __init__(self, depths, damage_factors, resolution=0.001):
+        depths = np.asarray(depths, dtype=float)
+        damage_factors = np.asarray(damage_factors, dtype=float)
+        if depths[0] > 0:
+            depths = np.concatenate([[0.0], depths])
+            damage_factors = np.concatenate([[0.0], damage_factors])
+        self.resolution = resolution
+        self.table = np.interp(np.arange(0, depths[-1] + resolution, resolution), depths, damage_factors)
+
+    @classmethod
+    def from_excel(cls, path=depth_damage_path, resolution=0.001):
+        """The depths and damage factors of the first two columns of the sheet (needs openpyxl to read xlsx files)"""
+        import pandas as pd
+        table = pd.read_excel(path, usecols=[0, 1]).dropna()
+        table = table[pd.to_numeric(table.iloc[:, 0], errors='coerce').notna()].astype(float) #the notes below the table are skipped
+        table = table.sort_values(table.columns[0])
+        return cls(table.iloc[:, 0].to_numpy(), table.iloc[:, 1].to_numpy(), resolution=resolution)
+
+    def damage_factor(self, flood_depth):
+        index = np.rint(np.asarray(flood_depth, dtype=float) / self.resolution)
+        return self.table[np.clip(index, 0, len(self.table) - 1).astype(np.int64)]
+
+    def damage_factor_one(self, flood_depth):
+        index = min(max(round(flood_depth / self.resolution), 0), len(self.table) - 1)
+        return float(self.table[index])
+
+
+_depth_damage_curves = {} #the curves are the same for every model in a process
+
+def get_depth_damage_curve(depth_damage_function):
+    """The depth damage curve 'log' (the regression used so far) or 'table' (the table in flood_depth-damage_function.xlsx)"""
+    if depth_damage_function not in _depth_damage_curves:
+        if depth_damage_function == 'log':
+            _depth_damage_curves[depth_damage_function] = LogDamageCurve()
+        elif depth_damage_function == 'table':
+            _depth_damage_curves[depth_damage_function] = TableDamageCurve.from_excel()
+        else:
+            raise ValueError(f"Unknown depth damage function: '{depth_damage_function}'. "
+                             f"Currently implemented functions are: 'log' and 'table'")
+    return _depth_damage_curves[depth_damage_function]
@@ -0,0 +1,253 @@
+# Importing necessary libraries
+import numpy as np
+
+# Import functions from functions.py
+from functions import prospect_theory_scores, risk_score, income_normal, exchange_money, numexpr
+
+
+class EngineColumn:
+    """
+    Attribute of a household that is stored in a column of the HouseholdEngine instead of on the agent itself.
+    The Households agent stays a thin view, so reporters and other agents can keep using agent.money etc.
+    If total is given, that running total on the engine is updated with the change every time the attribute is set.
+    If neighbours is given, that count on the engine is updated for the friends of the household in the social network.
+    If activate_neighbours is True, a change activates the friends of the household in the next step (see EventActivation).
+    """
+    def __init__(self, cast=None, total=None, neighbours=None, activate_neighbours=False):
+        self.cast = cast
+        self.total = total
+        self.neighbours = neighbours
+        self.activate_neighbours = activate_neighbours
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, agent, owner=None):
+        if agent is None:
+            return self
+        value = getattr(agent.engine, self.name)[agent.row]
+        if self.cast is not None:
+            return self.cast(value)
+        return value
+
+    def __set__(self, agent, value):
+        engine = agent.engine
+        column = getattr(engine, self.name)
+        if self.total is not None or self.neighbours is not None or self.activate_neighbours:
+            change = column.dtype.type(value).item() - column[agent.row].item() #booleans count as 1 and 0
+            if self.total is not None:
+                setattr(engine, self.total, getattr(engine, self.total) + change)
+            if change and engine.indptr is not None:
+                friends = engine.friends(agent.row)
+                if self.neighbours is not None:
+                    getattr(engine, self.neighbours)[friends] += change
+                if self.activate_neighbours:
+                    engine.active[friends] = True
+        column[agent.row] = value
+
+
+class HouseholdEngine:
+    """
+    Array backed state of all household agents. Every household owns one row in the columns below.
+
+    The random numbers households use in a step (for their prospect theory score, the costs of adapting and moving
+    and taking money from others) are drawn for all households at the start of each step from the step stream of
+    the model (see RandomStreams), in both the scalar and the vectorized mode, so the two modes use the same random
+    numbers for the same seed.
+
+    With vectorized=True the bookkeeping of the households (flood depth, damage, taxes, income, insurance
+    premiums and the prospect theory score) is done here as array operations for all households at once,
+    after which the scheduler only runs the decision part of Households.step. These batched updates give the
+    same values as the scalar functions for the same state and random numbers. The difference with the scalar
+    path is that all households are updated with the state at the start of the step (synchronous), where in
+    the scalar path a household sees the changes of the agents that were activated before it (the media
+    coverage, the insurance of neighbours and the money the government received so far).
+
+    So the vectorized mode only reproduces the scalar results for the same seed when none of these changes within a
+    step matter: with insurance=False and introduce_inequality=False the household state (money, adaptation,
+    moves and locations) is the same in both modes (see test_engine.py). With insurance the households decide on
+    insurance with the number of insured neighbours at the start of the step, and with inequality they take money
+    from households that already paid their taxes, so the runs differ from the first step on, but they follow the
+    same rules and give the same results on average.
+    """
+    adaptation_posibilites = ["None", "SandBags", "IntenseBarricading", "Move", "GovernmentBased"]
+
+    def __init__(self, model, size, vectorized=False, use_numexpr=False):
+        self.model = model
+        self.size = size
+        self.vectorized = vectorized
+        # evaluate the prospect theory scores with numexpr (see prospect_theory_scores), numpy is used when it is not installed
+        self.use_numexpr = use_numexpr and numexpr is not None
+        self.agents = [None] * size
+        self.number_of_rows = 0
+
+        self.money = np.zeros(size)
+        self.income = np.zeros(size)
+        self.risk_behavior = np.zeros(size)
+        self.insurance_benefit_estimated = np.zeros(size)
+        self.money_lost_because_of_flood_adaptation = np.zeros(size)
+        self.x = np.zeros(size)
+        self.y = np.zeros(size)
+        self.flood_depth_estimated = np.zeros(size)
+        self.flood_damage_estimated = np.zeros(size)
+        self.flood_depth_actual = np.zeros(size)
+        self.flood_damage_actual = np.zeros(size)
+        self.adaptation_number = np.zeros(size, dtype=np.int8) # index in adaptation_posibilites
+        self.step_adapted = np.zeros(size, dtype=np.int64)
+        self.is_adapted = np.zeros(size, dtype=bool)
+        self.is_insured = np.zeros(size, dtype=bool)
+        self.moved = np.zeros(size, dtype=bool)
+        self.adapted_because_government = np.zeros(size, dtype=bool) #already in model.adapted_because_government
+
+        # random numbers of the current step, see draw_step_randoms
+        self.cost_of_adapting_estimate = np.zeros(size, dtype=np.int64)
+        self.lambda_eq = np.zeros(size)
+        self.theta = np.zeros(size)
+        self.delta = np.zeros(size)
+        self.sandbags_cost = np.zeros(size, dtype=np.int64)
+        self.barricading_cost = np.zeros(size, dtype=np.int64)
+        self.cost_of_moving = np.zeros(size, dtype=np.int64)
+        self.take_money_partner = np.zeros(size, dtype=np.int64) #index in the schedule of the agent money is taken from
+        self.take_money_chance_self = np.zeros(size)
+        self.take_money_chance_other = np.zeros(size)
+
+        # prospect theory score of the current step, only filled in the vectorized mode
+        self.score_no_action = np.zeros(size)
+        self.score_action = np.zeros(size)
+        self.risk_perception = np.zeros(size)
+
+        # social network as a sparse (CSR) adjacency matrix, the friends of row i are indices[indptr[i]:indptr[i+1]]
+        # the network does not change, so the degree is counted once and the number of insured friends of every
+        # household is kept up to date when a household changes (see EngineColumn)
+        self.adjacency = None
+        self.indptr = None
+        self.indices = None
+        self.degree = np.zeros(size, dtype=np.int64)
+        self.neighbours_insured = np.zeros(size, dtype=np.int64)
+
+        # households that run their decisions in the next step with EventActivation, set by the events that can change
+        # their decision: a flood in their zone, a friend that adapts or stops, a new implementation close to them,
+        # a change of the media coverage and moving. Every household is active in the first step
+        self.active = np.ones(size, dtype=bool)
+
+        # running totals, kept up to date when a household changes (see EngineColumn) and recounted after changes to whole columns
+        self.adapted_count = 0
+        self.insured_count = 0
+        self.total_flood_damage_estimated = 0.0
+        self.total_flood_damage_actual = 0.0
+
+    def add(self, agent):
+        """Give a household its row in the columns"""
+        row = self.number_of_rows
+        self.agents[row] = agent
+        self.number_of_rows += 1
+        return row
+
+    def recount(self):
+        """Calculate the running totals again from the columns"""
+        self.adapted_count = int(self.is_adapted.sum())
+        self.insured_count = int(self.is_insured.sum())
+        self.total_flood_damage_estimated = float(self.flood_damage_estimated.sum())
+        self.total_flood_damage_actual = float(self.flood_damage_actual.sum())
+        if self.adjacency is not None:
+            self.neighbours_insured = self.adjacency @ self.is_insured.astype(np.int64)
+
+    def build_adjacency(self, adjacency):
+        """Use the CSR adjacency matrix of the social network, its rows follow the order the households were placed on the nodes"""
+        self.adjacency = adjacency
+        self.indptr = self.adjacency.indptr
+        self.indices = self.adjacency.indices
+        self.degree = np.diff(self.indptr)
+        self.recount()
+
+    def friends(self, row):
+        """Rows of the friends of a household in the social network"""
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+    def draw_initial_values(self, rng, income_mean):
+        """Draw the starting money, income, risk behavior and estimated insurance benefit of all households in one go"""
+        self.risk_behavior[:] = risk_score(size=self.size, rng=rng)
+        self.money[:] = income_normal(46000, size=self.size, rng=rng)
+        self.insurance_benefit_estimated[:] = rng.integers(100, 5000, self.size)
+        self.income[:] = income_normal(income_mean, size=self.size, rng=rng)
+
+    def draw_step_randoms(self, rng):
+        """Draw the random numbers the households need this step in one go"""
+        self.cost_of_adapting_estimate = rng.integers(100, 5000, self.size)
+        self.lambda_eq = rng.normal(2.25, 1, self.size)
+        self.theta = rng.normal(0.88, 0.065, self.size) #found by harrison and rutstrom
+        self.delta = rng.normal(0.69, 0.025, self.size)
+        self.sandbags_cost = rng.integers(100, 500, self.size)
+        self.barricading_cost = rng.integers(500, 2000, self.size)
+        self.cost_of_moving = rng.integers(1000, 5001, self.size)
+        self.take_money_partner = rng.integers(0, self.model.schedule.get_agent_count(), self.size)
+        self.take_money_chance_self = rng.random(self.size)
+        self.take_money_chance_other = rng.random(self.size)
+
+    def update_flood_depth(self):
+        """Estimated flood depth of all households, the flood map is only asked for the households that moved"""
+        depth = self.model.depth_cache.update(self.x, self.y)
+        self.flood_depth_estimated[:] = np.maximum(depth, 0) # handle negative values of flood depth
+
+    def update_flood_damage(self):
+        curve = self.model.damage_curve
+        self.flood_damage_estimated[:] = curve.damage(self.flood_depth_estimated, self.adaptation_number)
+        self.flood_damage_actual[:] = curve.damage(self.flood_depth_actual, self.adaptation_number)
+
+    def earn_money(self):
+        self.money += self.income
+
+    def decide_on_insurance(self):
+        """Same rules as Households.decide_on_insurance with the insured share of the neighbours at the start of the step"""
+        social_score = np.divide(self.neighbours_insured, self.degree, out=np.zeros(self.size), where=self.degree > 0)
+        return (social_score > 0.5) | (self.flood_damage_estimated > 0.5)
+
+    def pay_insurance_risk_based(self):
+        """Same rules as Households.pay_insurance_risk_based for all insured households"""
+        insured = self.is_insured
+        final_amount = self.risk_behavior * self.model.insurance_price
+        pays = insured & ((self.money / 2) >= final_amount)
+        self.money[pays] -= final_amount[pays]
+        self.model.insurance_agent.money += final_amount[pays].sum()
+        self.is_insured[insured & ~pays] = False
+
+    def update_prospect_theory_scores(self):
+        # all friends are counted as adapted friends, like in Households.count_friends_adapted
+        self.score_no_action, self.score_action, self.risk_perception = prospect_theory_scores(
+            money=self.money, is_insured=self.is_insured, insurance_benefit_estimated=self.insurance_benefit_estimated,
+            probability_of_flood=0.1, friends_adapted=self.degree, risk_behavior=self.risk_behavior,
+            number_of_households=self.model.number_of_households, media_coverage=self.model.media_coverage/2,
+            flood_damage_estimated=self.flood_damage_estimated, cost_of_adapting=self.cost_of_adapting_estimate,
+            lambda_eq=self.lambda_eq, theta=self.theta, delta=self.delta, use_numexpr=self.use_numexpr)
+
+    def prospect_score(self, row):
+        return [self.score_no_action[row], self.score_action[row], self.risk_perception[row]]
+
+    def exchange_money(self):
+        """take_money of all households at once with the partners and chances drawn this step, see exchange_money in functions.py"""
+        self.money[:] = exchange_money(self.money, self.take_money_partner, self.take_money_chance_self, self.take_money_chance_other)
+
+    def step(self):
+        """Bookkeeping of all households, done before the scheduler activates the agents"""
+        self.draw_step_randoms(self.model.streams.step)
+        # with the batched exchange the households take money from others here instead of in their step, every 5 steps
+        exchange = self.model.introduce_inequality and self.model.exchange == 'batched' and self.model.schedule.steps % 5 == 0
+        if not self.vectorized:
+            if exchange:
+                self.exchange_money()
+            self.recount() #so rounding errors of the running totals do not add up over the steps
+            return
+        self.update_flood_depth()
+        self.update_flood_damage()
+        for government in self.model.agents_by_type["government"]: #first pay tax
+            government.collect_taxes(self)
+        self.earn_money() #than earn money
+        steps = self.model.schedule.steps
+        if self.model.insurance:
+            decide = (steps % 5 == 0) | ((steps == 0) & ~self.is_adapted)
+            self.is_insured[decide] = self.decide_on_insurance()[decide]
+        self.pay_insurance_risk_based()
+        self.update_prospect_theory_scores()
+        if exchange: #after the scores, like the take_money in the decision part of Households.step
+            self.exchange_money()
+        self.recount()
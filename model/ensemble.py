@@ -0,0 +1,429 @@
+# Importing necessary libraries
+import numpy as np
+import pandas as pd
+import rasterio as rs
+import scipy.sparse as sp
+
+from model import AdaptationModel
+from agents import Government
+from engine import HouseholdEngine
+from raster import FloodDepthCache, get_depth_index
+from spatial import ImplementationIndex, HeightLocationStore, ZoneIndex
+from network import generate_network, edges_to_csr
+from streams import RandomStreams
+from damage import get_depth_damage_curve
+from functions import geodata, get_flood_map_data, get_rain_zones, get_rain_zones_y, get_rain_values, get_low_locations
+from functions import generate_random_locations_within_map_domain, move_locations, prospect_theory_scores, risk_score, income_normal, exchange_money
+
+
+class EnsembleModel:
+    """
+    Many replicas of one AdaptationModel configuration, one per seed, run together in lockstep.
+
+    The state of the households is kept in arrays of replicas x households, the rain in replicas x zones x steps and
+    the money of the government and the insurance and the media coverage in an array with one value per replica.
+    A step updates the households, the media, the government and the insurance of all replicas with array operations,
+    with the same rules as the agents in agents.py. The flood map, the model domain, the rain data and the depth damage
+    curve are loaded once and shared by all replicas. Every replica has its own RandomStreams from its seed and its own
+    social network, the networks of all replicas together are one block diagonal adjacency matrix.
+
+    The households of a replica all decide at once with the state at the start of the step, after which the media,
+    the government and the insurance take their step, in that order. So the replicas follow the same rules as
+    AdaptationModel(vectorized=True), but they are not the same runs as AdaptationModel with the same seed: there the
+    agents are activated one after another in a random order and see what the agents before them did.
+    The insurance pays the moving costs of the households that move in a step in the order of the households.
+
+    The model reporters of AdaptationModel are collected every step for every replica (see get_model_vars_dataframe
+    and get_replica_series), there is no household data. With introduce_inequality the households take money from
+    others with the batched exchange of AdaptationModel(exchange='batched'), within their own replica.
+    """
+    adaptation_posibilites = HouseholdEngine.adaptation_posibilites
+    reporters = ["total_adapted_households", "total_insured_households", "media_coverage", "number_of_floods", "current_policy",
+                 "AdaptedByGovernmentImplementation", "moneySpentOnPrevention", "householdFinancialDamage"]
+
+    def __init__(self,
+                 seeds,
+                 number_of_households = 25,
+                 insurance_price = 200,
+                 flood_map_choice = 'harvey',
+                 network = 'watts_strogatz',
+                 government_implementations = True,
+                 probability_of_network_connection = 0.4,
+                 introduce_inequality = False,
+                 number_of_edges = 3,
+                 number_of_steps = 20,
+                 household_income_mean = 15000,
+                 government_money = 10000000,
+                 insurance_money = 1000000,
+                 number_of_zones = 1,
+                 number_of_zones_y = 1,
+                 base_water_level = 0,
+                 number_of_nearest_neighbours = 5,
+                 media_coverage = 0,
+                 adaptation_threshold = 0.3,
+                 insurance = True,
+                 depth_damage_function = 'log',
+                 height_locations_capacity = 10000,
+                 relocation = 'depth_index',
+                 relocation_radius = 10000
+                 ):
+        if flood_map_choice not in AdaptationModel.flood_map_paths:
+            raise ValueError(f"Unknown flood map choice: '{flood_map_choice}'. "
+                             f"Currently implemented choices are: {list(AdaptationModel.flood_map_paths.keys())}")
+        self.seeds = list(seeds)
+        self.number_of_replicas = len(self.seeds)
+        self.number_of_households = number_of_households
+        self.insurance_price = insurance_price
+        self.government_implementations = government_implementations
+        self.number_of_steps = number_of_steps
+        self.base_water_level = base_water_level
+        self.adaptation_threshold = adaptation_threshold
+        self.insurance = insurance
+        if relocation not in ('depth_index', 'height_locations'):
+            raise ValueError(f"Unknown relocation: '{relocation}'. Currently implemented relocations are: 'depth_index' and 'height_locations'")
+        self.relocation = relocation
+        self.relocation_radius = relocation_radius
+        self.introduce_inequality = introduce_inequality
+        self.steps = 0
+        replicas = self.number_of_replicas
+        size = (replicas, number_of_households)
+        # independent random number generators for every replica, the same as those of AdaptationModel with that seed
+        self.streams = [RandomStreams(seed) for seed in self.seeds]
+
+        # inputs that are the same for all replicas
+        self.flood_map = rs.open(AdaptationModel.flood_map_paths[flood_map_choice])
+        self.band_flood_img, self.bound_left, self.bound_right, self.bound_top, self.bound_bottom = get_flood_map_data(self.flood_map)
+        self.damage_curve = get_depth_damage_curve(depth_damage_function)
+        self.depth_index = get_depth_index(self.flood_map, self.band_flood_img, geodata.map_domain_polygon) if relocation == 'depth_index' else None
+        self.number_of_zones = number_of_zones
+        self.rain_zones = get_rain_zones(number_of_zones, self.bound_left, self.bound_right, self.bound_bottom, self.bound_top)
+        self.rain_zones_y = get_rain_zones_y(number_of_zones_y, self.bound_bottom, self.bound_top)
+        zones = number_of_zones * number_of_zones_y
+        # x coordinate of the middle of every zone, a dike close to it prevents floods in the zone
+        self.zone_middle_x = np.array([(bounds[0] + bounds[1]) / 2 for bounds in self.rain_zones])[np.arange(zones) % number_of_zones]
+        self.rain_values = np.stack([get_rain_values(number_of_steps, zones, rng=streams.rain) for streams in self.streams])
+
+        # social networks of all replicas, replica r has rows r*number_of_households to (r+1)*number_of_households
+        adjacencies = []
+        for streams in self.streams:
+            u, v = generate_network(network, number_of_households, streams.network,
+                                    number_of_nearest_neighbours=number_of_nearest_neighbours,
+                                    probability_of_network_connection=probability_of_network_connection,
+                                    number_of_edges=number_of_edges)
+            adjacencies.append(edges_to_csr(number_of_households, u, v))
+        self.adjacency = sp.block_diag(adjacencies, format='csr')
+        self.degree = np.diff(self.adjacency.indptr).reshape(size)
+
+        # households
+        self.x = np.zeros(size)
+        self.y = np.zeros(size)
+        self.money = np.zeros(size)
+        self.income = np.zeros(size)
+        self.risk_behavior = np.zeros(size)
+        self.insurance_benefit_estimated = np.zeros(size)
+        for r, streams in enumerate(self.streams):
+            self.x[r], self.y[r] = generate_random_locations_within_map_domain(number_of_households, rng=streams.locations)
+            # same draws as HouseholdEngine.draw_initial_values
+            self.risk_behavior[r] = risk_score(size=number_of_households, rng=streams.households)
+            self.money[r] = income_normal(46000, size=number_of_households, rng=streams.households)
+            self.insurance_benefit_estimated[r] = streams.households.integers(100, 5000, number_of_households)
+            self.income[r] = income_normal(household_income_mean, size=number_of_households, rng=streams.households)
+        self.money_lost_because_of_flood_adaptation = np.zeros(size)
+        self.flood_depth_estimated = np.zeros(size)
+        self.flood_damage_estimated = np.zeros(size)
+        self.flood_depth_actual = np.zeros(size)
+        self.flood_damage_actual = np.zeros(size)
+        self.adaptation_number = np.zeros(size, dtype=np.int8) # index in adaptation_posibilites
+        self.step_adapted = np.zeros(size, dtype=np.int64)
+        self.is_adapted = np.zeros(size, dtype=bool)
+        self.is_insured = np.zeros(size, dtype=bool)
+        self.moved = np.zeros(size, dtype=bool)
+        self.adapted_because_government = np.zeros(size, dtype=bool)
+        self.protected = np.zeros(size, dtype=bool) #close to a government implementation
+        self.neighbours_insured = np.zeros(size, dtype=np.int64)
+        self.score_no_action = np.zeros(size)
+        self.score_action = np.zeros(size)
+        self.depth_cache = FloodDepthCache(self.flood_map, self.band_flood_img, replicas * number_of_households)
+        self.zone_index = ZoneIndex(self.rain_zones, self.rain_zones_y, replicas * number_of_households)
+        self.height_locations = [HeightLocationStore(capacity=height_locations_capacity, rng=streams.height_locations) for streams in self.streams]
+        self.update_flood_depth()
+        self.update_flood_damage()
+
+        # media, government and insurance of every replica
+        self.media_coverage = np.full(replicas, media_coverage)
+        self.government_money = np.full(replicas, float(government_money))
+        self.government_money_spent_on_prevention = np.zeros(replicas)
+        self.current_policy = np.full(replicas, 'No policy', dtype=object)
+        self.amount_of_policies = np.zeros(replicas, dtype=np.int64)
+        if self.depth_index is not None:
+            self.low_locations = np.array([np.column_stack(self.depth_index.lowest_of_sample(sample_size=100, number=20, rng=streams.government)) for streams in self.streams])
+        else:
+            self.low_locations = np.array([np.column_stack(get_low_locations(sample_size=100, corresponding_map=self.flood_map, band=self.band_flood_img, arrey_length=20, rng=streams.government))
+                                           for streams in self.streams])
+        # location and protection range of the implementations, nan where a replica has less implementations
+        self.implementation_x = np.full((replicas, 11), np.nan)
+        self.implementation_y = np.full((replicas, 11), np.nan)
+        self.implementation_reach = np.full((replicas, 11), np.nan)
+        self.dikes_x = np.full((replicas, 11), np.nan)
+        self.tax_brackets = sorted(Government.tax_rates)
+        self.tax_bracket_rates = np.array([Government.tax_rates[income] for income in self.tax_brackets])
+        self.insurance_money = np.full(replicas, float(insurance_money))
+        self.insurance_bankrupt = np.zeros(replicas, dtype=bool)
+        self.number_of_floods = np.zeros(replicas, dtype=np.int64)
+        self.household_damages = np.zeros(replicas)
+
+        self.model_vars = {name: [] for name in self.reporters}
+
+    def replicas(self, values):
+        """Split an array of all households of all replicas (flattened) back into replicas x households"""
+        return values.reshape(self.number_of_replicas, self.number_of_households)
+
+    def update_flood_depth(self):
+        depth = self.replicas(self.depth_cache.update(self.x.ravel(), self.y.ravel()))
+        self.flood_depth_estimated[:] = np.maximum(depth, 0)
+
+    def update_flood_damage(self):
+        self.flood_damage_estimated[:] = self.damage_curve.damage(self.flood_depth_estimated, self.adaptation_number)
+        self.flood_damage_actual[:] = self.damage_curve.damage(self.flood_depth_actual, self.adaptation_number)
+
+    def count_neighbours_insured(self):
+        self.neighbours_insured = self.replicas(self.adjacency @ self.is_insured.ravel().astype(np.int64))
+
+    def protection(self, replica, rows):
+        """Whether the households (rows) of a replica are close to one of its implementations"""
+        near = ((np.abs(self.x[replica, rows, None] - self.implementation_x[replica]) < self.implementation_reach[replica]) &
+                (np.abs(self.y[replica, rows, None] - self.implementation_y[replica]) < self.implementation_reach[replica]))
+        return near.any(axis=1) #nan compares as False
+
+    def draw_step_randoms(self):
+        """The same draws as HouseholdEngine.draw_step_randoms, for every replica from its own step stream"""
+        size = (self.number_of_replicas, self.number_of_households)
+        self.cost_of_adapting_estimate = np.zeros(size, dtype=np.int64)
+        self.lambda_eq = np.zeros(size)
+        self.theta = np.zeros(size)
+        self.delta = np.zeros(size)
+        self.sandbags_cost = np.zeros(size, dtype=np.int64)
+        self.barricading_cost = np.zeros(size, dtype=np.int64)
+        self.cost_of_moving = np.zeros(size, dtype=np.int64)
+        self.take_money_partner = np.zeros(size, dtype=np.int64)
+        self.take_money_chance_self = np.zeros(size)
+        self.take_money_chance_other = np.zeros(size)
+        n = self.number_of_households
+        for r, streams in enumerate(self.streams):
+            rng = streams.step
+            self.cost_of_adapting_estimate[r] = rng.integers(100, 5000, n)
+            self.lambda_eq[r] = rng.normal(2.25, 1, n)
+            self.theta[r] = rng.normal(0.88, 0.065, n)
+            self.delta[r] = rng.normal(0.69, 0.025, n)
+            self.sandbags_cost[r] = rng.integers(100, 500, n)
+            self.barricading_cost[r] = rng.integers(500, 2000, n)
+            self.cost_of_moving[r] = rng.integers(1000, 5001, n)
+            # households, media, government, insurance and implementations are the agents of AdaptationModel
+            self.take_money_partner[r] = rng.integers(0, n + 3 + self.amount_of_policies[r], n)
+            self.take_money_chance_self[r] = rng.random(n)
+            self.take_money_chance_other[r] = rng.random(n)
+
+    def flood(self):
+        """Decide for every replica and zone if it floods, like AdaptationModel.decide_if_flood, and apply the floods"""
+        if self.steps == 0: #don't flood at the start of the model run
+            return
+        rain = self.rain_values[:, :, self.steps]
+        dike_near_zone = (np.abs(self.dikes_x[:, :, None] - self.zone_middle_x) < ImplementationIndex.zone_protection_range).any(axis=1)
+        flood = ~dike_near_zone & (rain > 3)
+        if not flood.any():
+            return
+        self.number_of_floods += flood.sum(axis=1)
+        water_level = np.full((self.number_of_replicas, flood.shape[1] + 1), np.nan) #households in no zone (-1) get the nan at the end
+        water_level[:, :-1][flood] = self.base_water_level + rain[flood]
+
+        zone = self.replicas(self.zone_index.update(self.x.ravel(), self.y.ravel()))
+        water_level = np.take_along_axis(water_level, zone, axis=1)
+        replica, rows = np.nonzero(~np.isnan(water_level))
+        depths = water_level[replica, rows] + self.flood_depth_estimated[replica, rows]
+        damages = self.damage_curve.damage(depths, self.adaptation_number[replica, rows])
+        self.flood_depth_actual[replica, rows] = depths
+        self.flood_damage_actual[replica, rows] = damages
+        self.household_damages += np.bincount(replica, weights=damages * self.money[replica, rows], minlength=self.number_of_replicas)
+
+    def update_households(self):
+        """The bookkeeping of HouseholdEngine.step in the vectorized mode, for all replicas"""
+        steps = self.steps
+        self.draw_step_randoms()
+        self.update_flood_depth()
+        self.update_flood_damage()
+        #first pay tax
+        bracket = np.searchsorted(self.tax_brackets, self.income, side='right') - 1
+        money_owed = self.tax_bracket_rates[bracket] * self.money
+        self.money -= money_owed
+        self.government_money += money_owed.sum(axis=1)
+        self.money += self.income #than earn money
+        if self.insurance:
+            decide = (steps % 5 == 0) | ((steps == 0) & ~self.is_adapted)
+            social_score = np.divide(self.neighbours_insured, self.degree, out=np.zeros(self.degree.shape), where=self.degree > 0)
+            self.is_insured[decide] = ((social_score > 0.5) | (self.flood_damage_estimated > 0.5))[decide]
+        insured = self.is_insured
+        final_amount = self.risk_behavior * self.insurance_price
+        pays = insured & ((self.money / 2) >= final_amount)
+        self.money[pays] -= final_amount[pays]
+        self.insurance_money += np.where(pays, final_amount, 0).sum(axis=1)
+        self.is_insured[insured & ~pays] = False
+        # all friends are counted as adapted friends, like in Households.count_friends_adapted
+        self.score_no_action, self.score_action, _ = prospect_theory_scores(
+            money=self.money, is_insured=self.is_insured, insurance_benefit_estimated=self.insurance_benefit_estimated,
+            probability_of_flood=0.1, friends_adapted=self.degree, risk_behavior=self.risk_behavior,
+            number_of_households=self.number_of_households, media_coverage=self.media_coverage[:, None]/2,
+            flood_damage_estimated=self.flood_damage_estimated, cost_of_adapting=self.cost_of_adapting_estimate,
+            lambda_eq=self.lambda_eq, theta=self.theta, delta=self.delta)
+        self.count_neighbours_insured()
+        if self.introduce_inequality and steps % 5 == 0:
+            self.exchange_money()
+
+    def exchange_money(self):
+        """The batched exchange of HouseholdEngine.exchange_money in every replica, partners that are no household are no exchange"""
+        n = self.number_of_households
+        offset = np.arange(self.number_of_replicas)[:, None] * n
+        partner = np.where(self.take_money_partner < n, self.take_money_partner + offset, -1)
+        self.money[:] = self.replicas(exchange_money(self.money.ravel(), partner.ravel(), self.take_money_chance_self.ravel(), self.take_money_chance_other.ravel()))
+
+    def decide_households(self):
+        """The decisions of Households.step for all households of all replicas at once"""
+        steps = self.steps
+        # the low locations the households find are remembered for the households that move
+        if self.relocation == 'height_locations':
+            cells = self.replicas(self.depth_cache.rows * self.band_flood_img.shape[1] + self.depth_cache.cols)
+            dry = self.flood_depth_estimated < 0.025
+            for r, store in enumerate(self.height_locations):
+                store.add_many(cells[r, dry[r]], self.x[r, dry[r]], self.y[r, dry[r]])
+
+        government = self.protected #automatically adapted because of a government implementation
+        self.adapted_because_government |= government
+        wants = ~(self.score_no_action >= self.score_action) #nan scores adapt, like in decide_if_adapted
+        adapts = ~government & wants & ~self.moved
+        stops = ~government & ~(wants & ~self.moved) & (self.flood_depth_estimated > 0.5) & (steps - self.step_adapted > 4)
+        self.is_adapted[government] = True
+        self.adaptation_number[government] = self.adaptation_posibilites.index("GovernmentBased")
+
+        # decide_adapting_mechanism, which is given the estimated flood damage
+        damage = self.flood_damage_estimated
+        sandbags = adapts & (damage <= self.adaptation_threshold) & (self.money - self.sandbags_cost >= self.sandbags_cost)
+        self.money[sandbags] -= self.sandbags_cost[sandbags]
+        self.adaptation_number[sandbags] = self.adaptation_posibilites.index("SandBags")
+        barricading = (adapts & (damage > self.adaptation_threshold) & (damage <= self.adaptation_threshold*1.3) &
+                       (self.money - self.barricading_cost >= self.money))
+        self.money[barricading] -= self.barricading_cost[barricading]
+        self.adaptation_number[barricading] = self.adaptation_posibilites.index("IntenseBarricading")
+        moves = adapts & (damage > self.adaptation_threshold*1.3)
+        self.adaptation_number[moves] = self.adaptation_posibilites.index("Move")
+        self.is_adapted[adapts] = True
+        self.step_adapted[adapts] = steps
+        self.is_adapted[stops] = False
+        self.moved[stops] = False
+        self.move(moves)
+
+    def move(self, moves):
+        """Move the households of every replica that adapt by moving, like the move in Households.step"""
+        for r, streams in enumerate(self.streams):
+            rows = np.flatnonzero(moves[r])
+            if not len(rows):
+                continue
+            store = self.height_locations[r]
+            x = y = None
+            if self.relocation == 'depth_index':
+                locations = [self.depth_index.sample_near_below(self.x[r, row], self.y[r, row], self.relocation_radius, 0.025, streams.moves) for row in rows]
+                if locations[0] is not None: #either all households find a dry cell or there is none on the map
+                    x, y = np.array(locations).T
+            elif store:
+                x, y = store.sample_many(len(rows))
+                x, y = move_locations(x, y, rng=streams.moves) #move to a new location that is higher and close to other high living neighborhoods
+            if x is not None:
+                cost = self.cost_of_moving[r, rows]
+                pays = cost <= self.money[r, rows]
+                self.money[r, rows[pays]] -= cost[pays]
+                self.money_lost_because_of_flood_adaptation[r, rows[pays]] += cost[pays]
+                self.money[r, rows[~pays]] = 0
+                insured = pays & self.is_insured[r, rows]
+                self.money[r, rows[insured]] += cost[insured] #the insurance pays the moving costs, like Insurance.pay_agents
+                for covered in cost[insured].tolist():
+                    if self.insurance_money[r] >= covered:
+                        self.insurance_money[r] -= covered
+                    else:
+                        self.insurance_bankrupt[r] = True
+            else:
+                x, y = generate_random_locations_within_map_domain(len(rows), rng=streams.moves)
+            self.x[r, rows] = x
+            self.y[r, rows] = y
+            self.protected[r, rows] = self.protection(r, rows)
+        self.moved[moves] = True
+
+    def step_media(self):
+        """Media.step for all replicas"""
+        average_damage = self.flood_damage_actual.sum(axis=1) / self.number_of_households
+        self.media_coverage = np.where(average_damage < 0.2, 0, np.where(average_damage < 0.5, 1, 2))
+
+    def step_government(self):
+        """Government.step for all replicas"""
+        n = self.number_of_households
+        for r, streams in enumerate(self.streams):
+            expense = int(streams.government.integers(17000, 20001)) * n
+            self.government_money[r] = self.government_money[r] - expense if self.government_money[r] >= expense else 0
+            self.government_money[r] += int(streams.government.integers(150000, 500001))
+        if self.steps % 5 != 0 or not self.government_implementations:
+            return
+
+        # decide_policy
+        money_available = self.government_money.copy()
+        ratio_adapted = 1 - self.is_adapted.sum(axis=1) / n
+        policy_number = (ratio_adapted + self.flood_damage_estimated.sum(axis=1) / n + self.flood_damage_actual.sum(axis=1) / n) / 3
+        dikes = (0.4 <= policy_number) & (policy_number <= 0.5) & (money_available > 1000000)
+        water_locks = (policy_number >= 0.5) & (money_available > 3000000)
+        for chosen, policy, cost in ((dikes, "Dikes", 1000000), (water_locks, "Water locks", 3000000)):
+            self.current_policy[chosen] = policy
+            self.government_money[chosen] -= cost
+            self.government_money_spent_on_prevention[chosen] += cost
+
+        # implement the policy
+        for r in np.flatnonzero((dikes | water_locks) & (self.amount_of_policies <= 10)):
+            policy = "Water locks" if water_locks[r] else "Dikes"
+            self.amount_of_policies[r] += 1
+            i = self.amount_of_policies[r]
+            x, y = self.low_locations[r, i]
+            self.implementation_x[r, i - 1] = x
+            self.implementation_y[r, i - 1] = y
+            self.implementation_reach[r, i - 1] = ImplementationIndex.protection_range[policy]
+            if policy == "Dikes":
+                self.dikes_x[r, i - 1] = x
+            self.protected[r] |= self.protection(r, np.arange(n))
+
+    def collect(self):
+        values = {
+            "total_adapted_households": self.is_adapted.sum(axis=1),
+            "total_insured_households": self.is_insured.sum(axis=1),
+            "media_coverage": self.media_coverage.copy(),
+            "number_of_floods": self.number_of_floods.copy(),
+            "current_policy": self.current_policy.copy(),
+            "AdaptedByGovernmentImplementation": self.adapted_because_government.sum(axis=1),
+            "moneySpentOnPrevention": self.government_money_spent_on_prevention.copy(),
+            "householdFinancialDamage": self.household_damages.copy()
+        }
+        for name in self.reporters:
+            self.model_vars[name].append(values[name])
+
+    def step(self):
+        """One step of all replicas, in the order of AdaptationModel.step"""
+        self.flood()
+        self.collect()
+        self.update_households()
+        self.decide_households()
+        self.step_media()
+        self.step_government()
+        self.steps += 1
+
+    def get_model_vars_dataframe(self):
+        """The model reporters of every step and replica, with Step and Replica (the index in seeds) as index"""
+        steps = len(self.model_vars[self.reporters[0]])
+        index = pd.MultiIndex.from_product([range(steps), range(self.number_of_replicas)], names=["Step", "Replica"])
+        return pd.DataFrame({name: np.concatenate(values) if values else [] for name, values in self.model_vars.items()}, index=index)
+
+    def get_replica_series(self, name):
+        """One model reporter as a DataFrame with a row per step and a column per seed"""
+        return pd.DataFrame(np.array(self.model_vars[name]), columns=self.seeds).rename_axis(index="Step", columns="Seed")
@@ -5,15 +5,19 @@
 Functions that are used in the model_file.py and agent.py for the running of the Flood Adaptation Model.
 Functions get called by the Model and Agent class.
 """
+import os
 import random
 import numpy as np
 import math
 from shapely import contains_xy
-from shapely import prepare
-import geopandas as gpd
-from shapely.geometry import Point
-import pandas as pd
-from scipy.signal import argrelextrema
+
+from geodata import GeoData
+from raster import load_flood_band
+
+try:
+    import numexpr #optional, makes prospect_theory_scores faster for many households
+except ImportError:
+    numexpr = None
 
 def set_initial_values(input_data, parameter, seed):
     """
@@ -33,8 +37,7 @@ def set_initial_values(input_data, parameter, seed):
     parameter_set = 0
     parameter_data = input_data.loc[(input_data.parameter == parameter)] # get the distribution of values for the specified parameter
     parameter_data = parameter_data.reset_index()
-    random.seed(seed)
-    random_parameter = random.randint(0,100) 
+    random_parameter = random.Random(seed).randint(0,100) #own generator so the global random state is not reseeded
     for i in range(len(parameter_data)):
         if i == 0:
             if random_parameter < parameter_data['value_for_input'][i]:
@@ -49,19 +52,23 @@ def set_initial_values(input_data, parameter, seed):
     return parameter_set
 
 
-def get_flood_map_data(flood_map):
+def get_flood_map_data(flood_map, memory_map=True):
     """
     Getting the flood map characteristics.
     
     Parameters
     ----------
     flood_map: flood map in tif format
+    memory_map: if True the band is a read only memory map shared by all models (see load_flood_band), otherwise it is read into memory
 
     Returns
     -------
     band, bound_l, bound_r, bound_t, bound_b: characteristics of the tif-file
     """
-    band = flood_map.read(1)
+    if memory_map:
+        band = load_flood_band(flood_map)
+    else:
+        band = flood_map.read(1)
     bound_l = flood_map.bounds.left
     bound_r = flood_map.bounds.right
     bound_t = flood_map.bounds.top
@@ -71,46 +78,95 @@ def get_flood_map_data(flood_map):
 shapefile_path = r'../input_data/model_domain/houston_model/houston_model.shp'
 floodplain_path = r'../input_data/floodplain/floodplain_area.shp'
 
-# Model area setup
-map_domain_gdf = gpd.GeoDataFrame.from_file(shapefile_path)
-map_domain_gdf = map_domain_gdf.to_crs(epsg=26915)
-map_domain_geoseries = map_domain_gdf['geometry']
-map_minx, map_miny, map_maxx, map_maxy = map_domain_geoseries.total_bounds
-map_domain_polygon = map_domain_geoseries[0]  # The geoseries contains only one polygon
-prepare(map_domain_polygon)
-
-# Floodplain setup
-floodplain_gdf = gpd.GeoDataFrame.from_file(floodplain_path)
-floodplain_gdf = floodplain_gdf.to_crs(epsg=26915)
-floodplain_geoseries = floodplain_gdf['geometry']
-floodplain_multipolygon = floodplain_geoseries[0]  # The geoseries contains only one multipolygon
-prepare(floodplain_multipolygon)
-
-def generate_random_location_within_map_domain():
+# Model area and floodplain setup, the polygons are loaded when they are first used
+geodata = GeoData(shapefile_path, floodplain_path)
+
+def __getattr__(name):
+    """The geodata used to be loaded when this file was imported, these names still work but load it when first asked for"""
+    if name in ("map_domain_gdf", "map_domain_geoseries", "map_domain_polygon", "map_minx", "map_miny", "map_maxx", "map_maxy",
+                "floodplain_gdf", "floodplain_geoseries", "floodplain_multipolygon"):
+        return getattr(geodata, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def generate_random_location_within_map_domain(rng=None):
     """
     Generate random location coordinates within the map domain polygon.
 
+    Parameters
+    ----------
+    rng: numpy random Generator, a new unseeded one if None
+
     Returns
     -------
     x, y: lists of location coordinates, longitude and latitude
     """
+    rng = np.random.default_rng() if rng is None else rng
     while True:
         # generate random location coordinates within square area of map domain
-        x = random.uniform(map_minx, map_maxx)
-        y = random.uniform(map_miny, map_maxy)
+        x = rng.uniform(geodata.map_minx, geodata.map_maxx)
+        y = rng.uniform(geodata.map_miny, geodata.map_maxy)
         # check if the point is within the polygon, if so, return the coordinates
-        if contains_xy(map_domain_polygon, x, y):
+        if contains_xy(geodata.map_domain_polygon, x, y):
             return x, y
 
-def move(x, y):
+def generate_random_locations_within_map_domain(number_of_locations, block_size=1024, rng=None):
+    """
+    Generate many random locations within the map domain polygon at once.
+    Candidates are drawn in blocks and tested with one contains_xy call per block. The share of candidates that was
+    inside the polygon so far is used to choose the size of the next block.
+
+    Parameters
+    ----------
+    number_of_locations: number of locations that are needed
+    block_size: number of candidates in the first block
+    rng: numpy random Generator, a new unseeded one if None
+
+    Returns
+    -------
+    x, y: arrays of location coordinates, longitude and latitude
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    xs = []
+    ys = []
+    found = 0
+    drawn = 0
+    size = max(block_size, number_of_locations)
+    while found < number_of_locations:
+        # generate random location coordinates within square area of map domain
+        x = rng.uniform(geodata.map_minx, geodata.map_maxx, size)
+        y = rng.uniform(geodata.map_miny, geodata.map_maxy, size)
+        inside = contains_xy(geodata.map_domain_polygon, x, y)
+        xs.append(x[inside])
+        ys.append(y[inside])
+        found += int(inside.sum())
+        drawn += size
+        # enough candidates for the locations that are still missing with the share that was accepted so far
+        acceptance = max(found, 1) / drawn
+        size = max(block_size, int((number_of_locations - found) / acceptance * 1.1))
+    return np.concatenate(xs)[:number_of_locations], np.concatenate(ys)[:number_of_locations]
+
+def move(x, y, rng=None):
+     rng = np.random.default_rng() if rng is None else rng
      while True:
         # generate random location coordinates within square area of map domain
-        x = x + random.randint(-1000, 1000)
-        x = x + random.randint(-1000, 1000)
+        x = x + int(rng.integers(-1000, 1001))
+        x = x + int(rng.integers(-1000, 1001))
         # check if the point is within the polygon, if so, return the coordinates
-        if contains_xy(map_domain_polygon, x, y):
+        if contains_xy(geodata.map_domain_polygon, x, y):
             return x, y
 
+def move_locations(xs, ys, rng=None):
+    """move for many locations at once, the locations that end up outside the map domain are moved again"""
+    rng = np.random.default_rng() if rng is None else rng
+    xs = np.array(xs, dtype=float)
+    ys = np.array(ys, dtype=float)
+    outside = np.ones(len(xs), dtype=bool)
+    while outside.any():
+        xs[outside] += rng.integers(-1000, 1001, outside.sum())
+        xs[outside] += rng.integers(-1000, 1001, outside.sum())
+        outside[outside] = ~contains_xy(geodata.map_domain_polygon, xs[outside], ys[outside])
+    return xs, ys
+
 def get_flood_depth(corresponding_map, location, band):
     """ 
     To get the flood depth of a specific location within the model domain.
@@ -132,45 +188,26 @@ def get_flood_depth(corresponding_map, location, band):
 
     return depth
 
-def get_low_locations(sample_size, corresponding_map, band, arrey_length):
-    locations = {}
-    low_locations = []
-    
-    for i in range(sample_size):
-        x = random.uniform(map_minx, map_maxx)
-        y = random.uniform(map_miny, map_maxy)
-        location = Point(x,y)
-        depth = get_flood_depth(corresponding_map, location, band)
-        locations[depth] = location
-    
-    for i in range(arrey_length):
-        min_key = min(locations.keys())
-        low_location = locations[min_key]
-        low_locations.append(low_location)
-        locations.pop(min_key)
-        
-    return low_locations
-    
+def get_low_locations(sample_size, corresponding_map, band, arrey_length, rng=None):
+    """
+    The arrey_length locations with the lowest flood depth of sample_size random locations in the square around the
+    map domain, lowest first, as arrays x, y. Locations with the same depth are all kept.
+    See DepthIndex.lowest_of_sample for the same with the cells of the flood map in the map domain.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    xy = np.array([(rng.uniform(geodata.map_minx, geodata.map_maxx), rng.uniform(geodata.map_miny, geodata.map_maxy)) for i in range(sample_size)])
+    rows, cols = corresponding_map.index(xy[:, 0], xy[:, 1])
+    depth = band[np.abs(np.asarray(rows)) - 1, np.asarray(cols) - 1] #same as get_flood_depth
+    lowest = np.argsort(depth, kind='stable')[:arrey_length]
+    return xy[lowest, 0], xy[lowest, 1]
 
-def adapted_because_of_government_implementation(implementation_agents, agent):
-    """Function that decides if an agent gets adapted because it is close to an implementation"""
-    for i in implementation_agents:
-        x = i.location.x
-        y = i.location.y
-
-        diff_x = abs(agent.location.x - x)
-        diff_y = abs(agent.location.y - y)
-
-        if i.policy == "Dikes":
-            if diff_x < 8000 and diff_y < 8000:
-                if agent not in agent.model.adapted_because_government:
-                    agent.model.adapted_because_government.append(agent)
-                return True
-        elif i.policy == "Water locks": #water locks offer double the protection
-             if diff_x < 16000 and diff_y < 16000:
-                if agent not in agent.model.adapted_because_government:
-                    agent.model.adapted_because_government.append(agent)
-                return True
+def adapted_because_of_government_implementation(implementation_index, agent):
+    """Function that decides if an agent gets adapted because it is close to an implementation, see ImplementationIndex for the distances"""
+    if implementation_index.is_protected(agent.row, agent.engine.x[agent.row], agent.engine.y[agent.row]): #coordinates from the engine are faster than from the Point
+        if not agent.engine.adapted_because_government[agent.row]:
+            agent.engine.adapted_because_government[agent.row] = True
+            agent.model.adapted_because_government.append(agent)
+        return True
 
     return False
 
@@ -189,9 +226,9 @@ def get_position_flood(bound_l, bound_r, bound_t, bound_b, img, seed):
     x, y: location on the map
     row, col: location within the tif-file
     """
-    random.seed(seed)
-    x = random.randint(round(bound_l, 0), round(bound_r, 0))
-    y = random.randint(round(bound_b, 0), round(bound_t, 0))
+    generator = random.Random(seed) #own generator so the global random state is not reseeded
+    x = generator.randint(round(bound_l, 0), round(bound_r, 0))
+    y = generator.randint(round(bound_b, 0), round(bound_t, 0))
     row, col = img.index(x, y)
     return x, y, row, col
 
@@ -218,22 +255,27 @@ def calculate_basic_flood_damage(self, flood_depth):
         # see flood_damage.xlsx for function generation
         flood_damage = 0.1746 * math.log(flood_depth) + 0.6483
     
-    if self.current_adaptation != "None": #this is only the case if already adapted in the past
-        flood_damage = flood_damage/(self.adaptation_posibilites.index(self.current_adaptation)) #see household agent for different addoptation options
+    if self.adaptation_number != 0: #this is only the case if already adapted in the past
+        flood_damage = flood_damage/self.adaptation_number #see household agent for different addoptation options, the model uses damage.py
     return flood_damage
 
-def prospect_theory_score(agent, probability_of_flood, friends_adapted, risk_behavior, number_of_households, media_coverage, flood_damage_estimated, cost_of_adapting):
+def prospect_theory_score(agent, probability_of_flood, friends_adapted, risk_behavior, number_of_households, media_coverage, flood_damage_estimated, cost_of_adapting, lambda_eq=None, theta=None, delta=None):
     """
         Based on this article: https://onlinelibrary-wiley-com.tudelft.idm.oclc.org/doi/10.1111/risa.12740
         The score takes into account that low probability high risks situations are overweighted. 
         It also takes various social scores. 
+        lambda_eq, theta and delta are drawn here unless they are given (the household engine draws them for all households at once)
+        friends_adapted is the number of friends (see Households.count_friends_adapted)
     """
     
-    friend_score = (len(friends_adapted)/(number_of_households-1))
+    friend_score = (friends_adapted/(number_of_households-1))
     basian_weight = 0
-    lambda_eq = np.random.normal(2.25, 1)
-    theta = np.random.normal(0.88, 0.065) #found by harrison and rutstrom 
-    delta = np.random.normal(0.69, 0.025)
+    if lambda_eq is None:
+        lambda_eq = np.random.normal(2.25, 1)
+    if theta is None:
+        theta = np.random.normal(0.88, 0.065) #found by harrison and rutstrom 
+    if delta is None:
+        delta = np.random.normal(0.69, 0.025)
     
     flood_damage_estimated_money = flood_damage_estimated*agent.money #convert the flood damage to be economical
     #print(f"{flood_damage_estimated_money} and {lambda_eq} and {theta}")
@@ -262,70 +304,176 @@ def prospect_theory_score(agent, probability_of_flood, friends_adapted, risk_beh
     prospect_theory_score_no_action = basian_weight * utility_no_action
     
     #print(f"prospect theory score no action: {prospect_theory_score_no_action}, and action: {prospect_theory_score_action}")
-    scores = {
-        "Action": prospect_theory_score_action,
-        "noAction": prospect_theory_score_no_action,
-        "riskPerception": risk_perception
-    }
-    #dict not used in the end but that is a more solid way of implementing
     return [prospect_theory_score_no_action, prospect_theory_score_action, risk_perception]
 
-def risk_score():
+# prospect_theory_scores as one numexpr expression per result, the same formulas as below
+_prospect_theory_expressions = {
+    "risk_perception": "(friends_adapted/(number_of_households-1) + media_coverage + flood_damage_estimated + risk_behavior)/4",
+    "basian_weight": "(top_1**delta)/((top_1**delta) + ((1-top_1)**delta)**(1/delta))",
+    "score_no_action": "basian_weight * (-lambda_eq * (-(flood_damage_estimated*money) ** theta))",
+    "score_action": "basian_weight * where(is_insured, -lambda_eq * ((-cost_of_adapting + insurance_benefit_estimated) ** theta), -lambda_eq * (-cost_of_adapting ** theta))"
+}
+
+def prospect_theory_scores(money, is_insured, insurance_benefit_estimated, probability_of_flood, friends_adapted, risk_behavior, number_of_households, media_coverage, flood_damage_estimated, cost_of_adapting, lambda_eq, theta, delta, use_numexpr=False):
+    """
+    Array version of prospect_theory_score for all households at once, with the same formulas, so every element is the
+    same as prospect_theory_score gives for the same household and random draws.
+    friends_adapted is the number of friends of every household and lambda_eq, theta and delta are arrays of draws.
+    If numexpr is installed and use_numexpr is True the formulas are evaluated by numexpr, which does not make an
+    array for every step in between and uses all cores. The powers in numexpr are slower than in numpy on one core, so
+    this only pays off on machines with several cores (see use_numexpr of AdaptationModel).
+
+    Returns
+    -------
+    score_no_action, score_action, risk_perception: arrays with the same order as the list returned by prospect_theory_score
+    """
+    if numexpr is not None and use_numexpr:
+        values = {name: np.asarray(value, dtype=float) for name, value in
+                  [("money", money), ("insurance_benefit_estimated", insurance_benefit_estimated), ("friends_adapted", friends_adapted),
+                   ("risk_behavior", risk_behavior), ("flood_damage_estimated", flood_damage_estimated), ("cost_of_adapting", cost_of_adapting),
+                   ("lambda_eq", lambda_eq), ("theta", theta), ("delta", delta), ("number_of_households", number_of_households),
+                   ("media_coverage", media_coverage), ("probability_of_flood", probability_of_flood)]}
+        values["is_insured"] = np.asarray(is_insured, dtype=bool)
+        risk_perception = numexpr.evaluate(_prospect_theory_expressions["risk_perception"], local_dict=values)
+        values["top_1"] = numexpr.evaluate("10**((2*risk_perception)-1)*probability_of_flood", local_dict={"risk_perception": risk_perception, **values})
+        values["basian_weight"] = numexpr.evaluate(_prospect_theory_expressions["basian_weight"], local_dict=values)
+        score_no_action = numexpr.evaluate(_prospect_theory_expressions["score_no_action"], local_dict=values)
+        score_action = numexpr.evaluate(_prospect_theory_expressions["score_action"], local_dict=values)
+        return score_no_action, score_action, risk_perception
+
+    friend_score = friends_adapted/(number_of_households-1)
+    flood_damage_estimated_money = flood_damage_estimated*money #convert the flood damage to be economical
+
+    with np.errstate(divide='ignore', invalid='ignore'): #negative numbers to a broken power give nan, just like the scalar version
+        # the power of the insured households is only taken for them, the others keep -cost_of_adapting ** theta
+        utility_power = -(np.asarray(cost_of_adapting, dtype=float) ** theta)
+        np.power(-cost_of_adapting + insurance_benefit_estimated, theta, out=utility_power, where=np.asarray(is_insured, dtype=bool))
+        utility = -lambda_eq * utility_power
+        utility_no_action = -lambda_eq * (-flood_damage_estimated_money ** theta)
+
+        risk_perception = (friend_score + media_coverage + flood_damage_estimated + risk_behavior)/4
+
+        basian_weight_top_1 = (10**((2*risk_perception)-1)*probability_of_flood)
+        basian_weight_top_2 = basian_weight_top_1**delta
+        basian_weight_bottom = basian_weight_top_2 + ((1-basian_weight_top_1)**delta)**(1/delta)
+        basian_weight = basian_weight_top_2/basian_weight_bottom
+
+    return basian_weight * utility_no_action, basian_weight * utility, risk_perception
+
+def exchange_money(money, partner, chance_self, chance_other):
+    """
+    The take_money of all households at once, every household takes money from its partner with the same rules as
+    Households.take_money. All wagers are calculated with the money at the start of the exchange and all transfers
+    are applied together, so it does not matter in which order the households are. A household that loses more than
+    it has keeps nothing (0).
+
+    Parameters
+    ----------
+    money: money of every household
+    partner: index of the household money is taken from, indexes outside money (other agents) and the household itself are no exchange
+    chance_self: chance of the household taking money
+    chance_other: chance of its partner
+
+    Returns
+    -------
+    money: the money of every household after the exchange
+    """
+    households = np.flatnonzero((partner >= 0) & (partner < len(money)) & (partner != np.arange(len(money))))
+    others = partner[households]
+    self_score = (money[households] * chance_self[households])/3
+    other_score = (money[others] * chance_other[households])/3
+    wins = self_score > other_score
+    loses = (other_score > self_score)
+    pays = loses & (money[households] > other_score) #the household only pays when it has more than the score of the other
+    gain = (np.bincount(households[wins], weights=other_score[wins], minlength=len(money)) +
+            np.bincount(others[loses], weights=self_score[loses], minlength=len(money)))
+    loss = (np.bincount(others[wins], weights=other_score[wins], minlength=len(money)) +
+            np.bincount(households[pays], weights=other_score[pays], minlength=len(money)))
+    return money - np.minimum(loss, np.maximum(money, 0)) + gain
+
+def truncated_normal(mean, sd, low, high, size=None, rng=None):
+    """
+    Draws from a normal distribution that are between low and high, values outside are drawn again.
+    This is the same distribution as drawing 1000 values and picking one of the values between low and high.
+
+    Parameters
+    ----------
+    size: number of draws, one float if None
+    rng: numpy random Generator, a new unseeded one if None
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    values = rng.normal(mean, sd, 1 if size is None else size)
+    outside = (values < low) | (values > high)
+    while outside.any():
+        values[outside] = rng.normal(mean, sd, outside.sum())
+        outside = (values < low) | (values > high)
+    if size is None:
+        return float(values[0])
+    return values
+
+def risk_score(size=None, rng=None):
     """Generate a normal distrobution for the risk behavior"""
     #creating a normal random distro between 0 and 1
     #the average was tested to be between 0.48 and 0.53
-    dist = np.random.normal(0.5,0.5,1000) #
-    dist_positive = dist[dist>=0]
-    risk = dist_positive[dist_positive <= 1]
-    
-    risk_pick = risk[np.random.randint( 0, len(risk) ) ]
-
-    #print(risk)
-    #print(np.average(risk))
-    return risk_pick
+    return truncated_normal(0.5, 0.5, 0, 1, size=size, rng=rng)
 
-def income_normal(mean):
+def income_normal(mean, size=None, rng=None):
     """Generate income based on a normal dist, mean could be used if need for varying later"""
-    income = np.random.normal(15000, 5000, 1000)
-    income_pos = income[income>=0]
-    
-    return income_pos[np.random.randint(0, len(income_pos))]
-
-
-def get_rain_list(steps):
-    """Function for getting a steps length dict with random rainvalues"""
-    #df = pd.read_csv(r'../input_data/Delft_rain_data.csv', skiprows=27, on_bad_lines='skip', delimiter=",") Delft to test
-    df = pd.read_csv(r"../input_data/houston_rain_data.csv", on_bad_lines='skip', delimiter=",")
-    #df = df[:8784]
-    df = df['rainfall']
-    values = []
-    for i in range(steps):
-        value = df[np.random.randint(0, len(df))]
-        values.append(value)
-    
-    return values
+    return truncated_normal(15000, 5000, 0, np.inf, size=size, rng=rng)
 
-def get_rain_dict(steps, number_of_zones, b_l, b_r, b_b, b_t): #devide the zones can do y later
-    """Putting the rain values in a list based on the number of zones used, if wanted y bounds can be added for squere zones"""
-    rain_dict = {}
-    x = b_l + b_r
-    #y = b_b + b_t
-    x = x/number_of_zones
-    #y = y/number_of_zones
-    
-    for i in range(number_of_zones):
-        if i == 0: #first run will start at the left side of the map so x cord 0
-            cord = []
-            cord.append(0)
-            cord.append(x*(i+1))
-            x = x*(i+1)
-        else: #other zones begin at the next x cord of the zone which is the x step times zone number
-            cord = []
-            cord.append(x)
-            cord.append(x*(i+1))
-            x = x*(i+1)
-            
-        values = get_rain_list(steps)
-        rain_dict[tuple(cord)] = values #this is a dict with the coordinate bounds of the zone and their own generated rain values for that area
-    
-    return rain_dict
\ No newline at end of file
+
+rain_data_path = r"../input_data/houston_rain_data.csv"
+#rain_data_path = r'../input_data/Delft_rain_data.csv' Delft to test (needs skiprows=27)
+_rain_data = {} #rain values per csv file, so every process only reads the csv once
+
+def load_rain_data(path=rain_data_path):
+    """
+    The rainfall column of the rain data csv as an array.
+    It is kept in memory after the first call, and saved as a .npy file next to the csv so later processes do not have to
+    parse the csv with pandas (the .npy file is made again when the csv is newer).
+    """
+    if path not in _rain_data:
+        cache_path = os.path.splitext(path)[0] + "_rainfall.npy"
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+            values = np.load(cache_path)
+        else:
+            import pandas as pd #only needed when there is no cache yet
+            df = pd.read_csv(path, on_bad_lines='skip', delimiter=",")
+            #df = df[:8784]
+            values = df['rainfall'].to_numpy(dtype=float)
+            temporary_path = f"{cache_path}.{os.getpid()}.tmp" #written first so other processes never read half a file
+            try:
+                with open(temporary_path, "wb") as f:
+                    np.save(f, values)
+                os.replace(temporary_path, cache_path)
+            except OSError:
+                pass
+        _rain_data[path] = values
+    return _rain_data[path]
+
+def get_rain_zones(number_of_zones, b_l, b_r, b_b, b_t): #devide the zones can do y later
+    """The x coordinate bounds of every zone, the map is divided in columns of the same width (see get_rain_zones_y for the rows)"""
+    x = np.linspace(b_l, b_r, number_of_zones + 1)
+    return [(x[i], x[i+1]) for i in range(number_of_zones)]
+
+def get_rain_zones_y(number_of_zones_y, b_b, b_t):
+    """The y coordinate bounds of every row of zones, the map is divided in rows of the same height"""
+    y = np.linspace(b_b, b_t, number_of_zones_y + 1)
+    return [(y[i], y[i+1]) for i in range(number_of_zones_y)]
+
+def get_rain_values(steps, number_of_zones, rng):
+    """
+    Random rain values for every zone and step, drawn from the rain data in one go.
+
+    Parameters
+    ----------
+    steps: number of steps
+    number_of_zones: number of zones
+    rng: numpy random Generator used for the draw
+
+    Returns
+    -------
+    rain_values: array with a row of steps rain values for every zone
+    """
+    rain_data = load_rain_data()
+    return rain_data[rng.integers(0, len(rain_data), size=(number_of_zones, steps))]
@@ -0,0 +1,103 @@
+# Importing necessary libraries
+import os
+import shapely
+from shapely import prepare
+
+
+class GeoData:
+    """
+    The model domain and floodplain polygons, loaded the first time they are used instead of when the code is imported.
+
+    The shapefiles are only read with geopandas and reprojected to EPSG:26915 once. The reprojected polygon is then
+    saved as WKB next to the shapefile, and later processes read that file, which skips geopandas and to_crs.
+    The WKB file is made again when the shapefile is newer. If it can not be written the polygon is still used.
+    """
+    epsg = 26915
+
+    def __init__(self, shapefile_path, floodplain_path):
+        self.shapefile_path = shapefile_path
+        self.floodplain_path = floodplain_path
+        self._map_domain_polygon = None
+        self._floodplain_multipolygon = None
+        self._map_domain_gdf = None
+        self._floodplain_gdf = None
+
+    def cache_path(self, path):
+        return os.path.splitext(path)[0] + f"_epsg{self.epsg}.wkb"
+
+    def load_polygon(self, path):
+        """First geometry of the shapefile in EPSG:26915, prepared for fast contains checks"""
+        cache_path = self.cache_path(path)
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+            with open(cache_path, "rb") as f:
+                polygon = shapely.from_wkb(f.read())
+        else:
+            import geopandas as gpd #only needed when there is no cache yet
+            gdf = gpd.GeoDataFrame.from_file(path)
+            gdf = gdf.to_crs(epsg=self.epsg)
+            polygon = gdf['geometry'][0] # The geoseries contains only one (multi)polygon
+            temporary_path = f"{cache_path}.{os.getpid()}.tmp" #written first so other processes never read half a file
+            try:
+                with open(temporary_path, "wb") as f:
+                    f.write(shapely.to_wkb(polygon))
+                os.replace(temporary_path, cache_path)
+            except OSError:
+                pass
+        prepare(polygon)
+        return polygon
+
+    def use_polygons(self, map_domain_polygon, floodplain_multipolygon):
+        """Use these polygons (in EPSG:26915) instead of the shapefiles, e.g. the synthetic ones of benchmark.py"""
+        prepare(map_domain_polygon)
+        prepare(floodplain_multipolygon)
+        self._map_domain_polygon = map_domain_polygon
+        self._floodplain_multipolygon = floodplain_multipolygon
+        self._map_domain_gdf = None
+        self._floodplain_gdf = None
+        self.map_minx, self.map_miny, self.map_maxx, self.map_maxy = map_domain_polygon.bounds
+
+    def as_gdf(self, polygon):
+        import geopandas as gpd
+        return gpd.GeoDataFrame(geometry=[polygon], crs=f"EPSG:{self.epsg}")
+
+    @property
+    def map_domain_polygon(self):
+        if self._map_domain_polygon is None:
+            self._map_domain_polygon = self.load_polygon(self.shapefile_path)
+            self.map_minx, self.map_miny, self.map_maxx, self.map_maxy = self._map_domain_polygon.bounds
+        return self._map_domain_polygon
+
+    @property
+    def floodplain_multipolygon(self):
+        if self._floodplain_multipolygon is None:
+            self._floodplain_multipolygon = self.load_polygon(self.floodplain_path)
+        return self._floodplain_multipolygon
+
+    def __getattr__(self, name):
+        # the bounds are set when the model domain is loaded
+        if name in ("map_minx", "map_miny", "map_maxx", "map_maxy"):
+            self.map_domain_polygon
+            return self.__dict__[name]
+        raise AttributeError(name)
+
+    @property
+    def map_domain_gdf(self):
+        """GeoDataFrame with only the geometry of the model domain, for plotting"""
+        if self._map_domain_gdf is None:
+            self._map_domain_gdf = self.as_gdf(self.map_domain_polygon)
+        return self._map_domain_gdf
+
+    @property
+    def floodplain_gdf(self):
+        """GeoDataFrame with only the geometry of the floodplain, for plotting"""
+        if self._floodplain_gdf is None:
+            self._floodplain_gdf = self.as_gdf(self.floodplain_multipolygon)
+        return self._floodplain_gdf
+
+    @property
+    def map_domain_geoseries(self):
+        return self.map_domain_gdf['geometry']
+
+    @property
+    def floodplain_geoseries(self):
+        return self.floodplain_gdf['geometry']
@@ -1,16 +1,32 @@
 # Importing necessary libraries
+from collections import defaultdict
 import networkx as nx
+import numpy as np
 from mesa import Model, Agent
 from mesa.time import RandomActivation
 from mesa.space import NetworkGrid
-from mesa.datacollection import DataCollector
 import rasterio as rs
 import matplotlib.pyplot as plt
+from shapely.geometry import Point
 # Import the agent class(es) from agents.py
 from agents import Households, Media, Government, Insurance
+from engine import HouseholdEngine
+from activation import EventActivation
+from raster import FloodDepthCache, load_flood_band, get_depth_index
+from spatial import ImplementationIndex, HeightLocationStore, ZoneIndex
+from collector import ColumnarCollector, PicklableDataCollector
+from network import generate_network, edges_to_csr, to_networkx
+from streams import RandomStreams
+from damage import get_depth_damage_curve
+from run_log import RunLog
 # Import functions from functions.py
-from functions import get_flood_map_data, calculate_basic_flood_damage, get_rain_dict
-from functions import map_domain_gdf, floodplain_gdf
+from functions import get_flood_map_data, get_rain_zones, get_rain_zones_y, get_rain_values, generate_random_locations_within_map_domain
+from functions import geodata
+
+
+def friends_count(agent):
+    """Agent reporter of the number of friends, a function instead of a lambda so the data collector can be pickled"""
+    return agent.count_friends(radius=1)
 
 
 # Define the AdaptationModel class
@@ -19,6 +35,13 @@ class AdaptationModel(Model):
     The main model running the simulation. It sets up the network of household agents,
     simulates their behavior, and collects data. The network type can be adjusted based on study requirements.
     """
+    # Define paths to flood maps
+    flood_map_paths = {
+        'harvey': r'../input_data/floodmaps/Harvey_depth_meters.tif',
+        '100yr': r'../input_data/floodmaps/100yr_storm_depth_meters.tif',
+        '500yr': r'../input_data/floodmaps/500yr_storm_depth_meters.tif',  # Example path for 500yr flood map
+        'Netherlands': r'../input_data/floodmaps/Netherlands.tif' 
+    }
 
     def __init__(self, 
                  seed = None,
@@ -27,6 +50,10 @@ class AdaptationModel(Model):
                  # in dollar and adjusted for inflation to 2020 value
                  max_damage_dol_per_sqm = 1216.65,
                  logging = False,
+                 # with logging every run writes its own JSON lines file in log_dir, see RunLog for the level and the sample rate
+                 log_dir = 'logs',
+                 log_level = 'debug',
+                 log_sample_rate = 1.0,
                  insurance_price = 200,
                  # Simplified argument for choosing flood map. Can currently be "harvey", "100yr", or "500yr".
                  flood_map_choice='harvey',
@@ -34,10 +61,15 @@ class AdaptationModel(Model):
                  # The social network structure that is used.
                  # Can currently be "erdos_renyi", "barabasi_albert", "watts_strogatz", or "no_network"
                  network = 'watts_strogatz',
+                 # "numpy" makes the network as arrays (see network.py), "networkx" with the networkx generators like before
+                 network_backend = 'numpy',
                  government_implementations = True,
                  # likeliness of edge being created between two nodes
                  probability_of_network_connection = 0.4,
                  introduce_inequality = False,
+                 # with introduce_inequality, "sequential" lets the households take money from others one at a time in their
+                 # step like before, "batched" all at once every 5 steps (faster, see HouseholdEngine.exchange_money)
+                 exchange = 'sequential',
                  # number of edges for BA network
                  number_of_edges = 3,
                  number_of_steps = 20,
@@ -45,12 +77,33 @@ class AdaptationModel(Model):
                  government_money = 10000000,
                  insurance_money = 1000000,
                  number_of_zones = 1,
+                 number_of_zones_y = 1, # the zones are a grid of number_of_zones columns and number_of_zones_y rows
                  base_water_level = 0, #the base of the water level
                  # number of nearest neighbours for WS social network
                  number_of_nearest_neighbours = 5,
                  media_coverage = 0,
                  adaptation_threshold = 0.3,
-                 insurance = True
+                 insurance = True,
+                 # "log" for the logarithmic depth damage curve or "table" for the table in flood_depth-damage_function.xlsx
+                 depth_damage_function = 'log',
+                 # maximum number of high locations that are remembered for households that move
+                 height_locations_capacity = 10000,
+                 # where households that move go: "depth_index" a random dry cell of the flood map within relocation_radius
+                 # (meters) of their home (see DepthIndex), "height_locations" a location other households found dry like before
+                 relocation = 'depth_index',
+                 relocation_radius = 10000,
+                 # update the bookkeeping of all households with array operations instead of one agent at a time
+                 vectorized = False,
+                 # evaluate the prospect theory scores of the vectorized mode with numexpr, only faster on several cores
+                 # and ignored when numexpr is not installed
+                 use_numexpr = False,
+                 # "random" steps every agent every step, "event" only the households that had an event since their last
+                 # step (see EventActivation), the bookkeeping of the other households is then done in bulk (vectorized)
+                 activation = 'random',
+                 # directory to stream the data to in columns instead of keeping it in the Mesa DataCollector
+                 columnar_output = None,
+                 # steps between two collections of a household column when columnar_output is used, e.g. {"Money": 5}
+                 collection_intervals = None
                  ):
         
         super().__init__(seed = seed)
@@ -58,7 +111,13 @@ class AdaptationModel(Model):
         # defining the variables and setting the values
         self.number_of_households = number_of_households  # Total number of household agents
         self.seed = seed #?
+        # independent random number generators for the parts of the model, all made from the seed
+        self.streams = RandomStreams(seed)
         self.logging = logging
+        self.run_log = None
+        self.log_settings = {"log_dir": log_dir, "name": f"run_seed{seed}", "level": log_level, "sample_rate": log_sample_rate}
+        if logging:
+            self.run_log = RunLog(**self.log_settings, rng=self.streams.logging)
         self.insurance = insurance
         self.government_money = government_money
         self.government_implementations = government_implementations
@@ -67,19 +126,32 @@ class AdaptationModel(Model):
         self.household_income_mean = household_income_mean
         self.adapted_because_government = []
         self.introduce_inequality = introduce_inequality
+        if exchange not in ('batched', 'sequential'):
+            raise ValueError(f"Unknown exchange: '{exchange}'. Currently implemented exchanges are: 'batched' and 'sequential'")
+        self.exchange = exchange
         self.number_of_steps = number_of_steps
         self.current_policy = 'No policy'
         self.number_of_floods = 0
-        self.water_level = {}
+        self.water_level = None #water level of every zone in this step, nan if there is no flood in the zone
         self.number_of_zones = number_of_zones
-        self.rain_values = {}
-        self.height_locations = []
-        self.implementation_agents = []
+        self.number_of_zones_y = number_of_zones_y
+        self.rain_zones = [] #x coordinate bounds of every column of zones
+        self.rain_zones_y = [] #y coordinate bounds of every row of zones
+        self.rain_values = None #rain of every zone (rows) in every step (columns)
+        self.height_locations = HeightLocationStore(capacity=height_locations_capacity, rng=self.streams.height_locations)
+        if relocation not in ('depth_index', 'height_locations'):
+            raise ValueError(f"Unknown relocation: '{relocation}'. Currently implemented relocations are: 'depth_index' and 'height_locations'")
+        self.relocation = relocation
+        self.relocation_radius = relocation_radius
         self.base_water_level = base_water_level
         self.max_damage_dol_per_sqm = max_damage_dol_per_sqm
+        self.damage_curve = get_depth_damage_curve(depth_damage_function)
         self.media_coverage = media_coverage
         self.adaptation_threshold = adaptation_threshold
         self.insurance_agent = None
+        self.government_agent = None
+        self.agents_by_type = defaultdict(list) # registry of the agents by their type, so the schedule does not have to be searched
+        self.implementation_agents = self.agents_by_type["implementation"]
         self.government_money_spent_on_prevention = 0
         self.household_damages = 0
         # network
@@ -90,36 +162,75 @@ class AdaptationModel(Model):
 
 
         # generating the graph according to the network used and the network parameters specified
-        self.G = self.initialize_network()
-        # create grid out of network graph
-        self.grid = NetworkGrid(self.G)
+        # the networkx graph and the NetworkGrid are only made when they are used (see G and grid)
+        self._G = None
+        self._grid = None
+        if network_backend == 'networkx':
+            self._G = self.initialize_network()
+            nodes = list(self._G.nodes())
+            adjacency = nx.to_scipy_sparse_array(self._G, nodelist=nodes, dtype=np.int64, weight=None, format='csr')
+        elif network_backend == 'numpy':
+            nodes = range(self.number_of_households)
+            u, v = generate_network(self.network, self.number_of_households, self.streams.network,
+                                    number_of_nearest_neighbours=self.number_of_nearest_neighbours,
+                                    probability_of_network_connection=self.probability_of_network_connection,
+                                    number_of_edges=self.number_of_edges)
+            adjacency = edges_to_csr(self.number_of_households, u, v)
+        else:
+            raise ValueError(f"Unknown network backend: '{network_backend}'. Currently implemented backends are: 'numpy' and 'networkx'")
 
         # Initialize maps
         self.initialize_maps(flood_map_choice)
 
         # set schedule for agents
-        self.schedule = RandomActivation(self)  # Schedule for activating agents
+        if activation == 'random':
+            self.schedule = RandomActivation(self)  # Schedule for activating agents
+        elif activation == 'event':
+            self.schedule = EventActivation(self)
+            vectorized = True #the dormant households only get the bulk bookkeeping of the vectorized engine
+        else:
+            raise ValueError(f"Unknown activation: '{activation}'. Currently implemented activations are: 'random' and 'event'")
+
+        # the state of the households is kept in arrays, the household agents are views on a row of these arrays
+        self.household_engine = HouseholdEngine(self, self.number_of_households, vectorized=vectorized, use_numexpr=use_numexpr)
+        # the depth on the flood map of every household is only looked up again when the household moves
+        self.depth_cache = FloodDepthCache(self.flood_map, self.band_flood_img, self.number_of_households)
+        # the rain zone of every household, only looked up again when the household moves
+        self.zone_index = ZoneIndex(self.rain_zones, self.rain_zones_y, self.number_of_households)
+        # which households are protected by government implementations, updated when the government adds one
+        self.implementation_index = ImplementationIndex(self.number_of_households)
+
+        # random locations within the map domain for all households in one go
+        locations_x, locations_y = generate_random_locations_within_map_domain(self.number_of_households, rng=self.streams.locations)
+        # starting money, income and risk behavior of all households in one go
+        self.household_engine.draw_initial_values(self.streams.households, self.household_income_mean)
 
         # create households through initiating a household on each node of the network graph
-        for i, node in enumerate(self.G.nodes()):
-            household = Households(unique_id=i, model=self, adaptation_threshold=self.adaptation_threshold, income_mean=self.household_income_mean, insurance_price=insurance_price, insurance=self.insurance)
-            self.schedule.add(household)
-            self.grid.place_agent(agent=household, node_id=node)
+        for i, node in enumerate(nodes):
+            household = Households(unique_id=i, model=self, adaptation_threshold=self.adaptation_threshold, income_mean=self.household_income_mean, insurance_price=insurance_price, insurance=self.insurance,
+                                   location=Point(locations_x[i], locations_y[i]))
+            self.add_agent(household)
+            household.pos = node
+        # estimated flood depth and damage of all households in one lookup on the flood map
+        self.household_engine.update_flood_depth()
+        self.household_engine.update_flood_damage()
+        self.household_engine.build_adjacency(adjacency) #also counts the adapted and insured friends of every household
         
         media = Media(unique_id=i+1, model=self)
-        self.schedule.add(media)
+        self.add_agent(media)
 
         government = Government(unique_id=i+2, model=self, money=government_money, implementations=self.government_implementations)
-        self.schedule.add(government)
+        self.add_agent(government)
 
         insurance = Insurance(unique_id=i+3, model=self, money=insurance_money)
-        self.schedule.add(insurance)
+        self.add_agent(insurance)
 
         # You might want to create other agents here, e.g. insurance agents.
 
         # Data collection setup to collect data
         model_metrics = {
                         "total_adapted_households": self.total_adapted_households,
+                        "total_insured_households": self.total_insured_households,
                         "media_coverage": self.current_media_attention,
                         "number_of_floods": self.get_number_of_floods,
                         "current_policy": self.get_current_policy,
@@ -138,17 +249,122 @@ class AdaptationModel(Model):
                         "Currentadaptation": "current_adaptation",
                         "Money": "money",
                         "IsInsured": "is_insured",
-                        "FriendsCount": lambda a: a.count_friends(radius=1),
+                        "FriendsCount": friends_count,
                         "location": "location"
                         # ... other reporters ...
                         }
         #set up the data collector 
-        self.datacollector = DataCollector(model_reporters=model_metrics,agent_reporters=agent_metrics)
+        if columnar_output is None:
+            self.datacollector = PicklableDataCollector(model_reporters=model_metrics,agent_reporters=agent_metrics)
+        else:
+            # only numbers can be put in a column, so the households adapted because of the government are counted
+            model_metrics["AdaptedByGovernmentImplementation"] = self.count_adapted_because_government_measures
+            self.datacollector = ColumnarCollector(self, columnar_output, model_metrics, intervals=collection_intervals)
             
 
+    def __getstate__(self):
+        """
+        State of the model for pickle (see checkpoint.py). The flood map is kept as its path and a memory mapped band
+        is left out, both are opened again in __setstate__. The depth index is opened again when it is used. The run
+        log is not kept, a restored model starts a new one.
+        """
+        state = self.__dict__.copy()
+        state["flood_map"] = self.flood_map.name
+        if isinstance(self.band_flood_img, np.memmap):
+            state["band_flood_img"] = None
+        state["run_log"] = None
+        state["_depth_index"] = None #opened again when it is used
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.flood_map = rs.open(self.flood_map)
+        if self.band_flood_img is None:
+            self.band_flood_img = load_flood_band(self.flood_map) #the band that is already mapped in this process
+        self.depth_cache.corresponding_map = self.flood_map
+        self.depth_cache.band = self.band_flood_img
+        if self.logging:
+            self.run_log = RunLog(**self.log_settings, rng=self.streams.logging)
+
+    def close(self):
+        """Write the last records of the run log and stop its thread, call this when the run is done"""
+        if self.run_log is not None:
+            self.run_log.close()
+
+    scenario_parameters = ("government_implementations", "insurance_price", "media_coverage")
+
+    def set_scenario(self, **parameters):
+        """
+        Change parameters of a model that is already running, e.g. of the scenarios forked from a checkpoint (see
+        checkpoint.py). The parameters that can be changed are in scenario_parameters.
+        """
+        for name, value in parameters.items():
+            if name == "government_implementations":
+                self.government_implementations = value
+                self.government_agent.implementations = value
+            elif name == "insurance_price":
+                self.insurance_price = value
+                for household in self.agents_by_type["household"]:
+                    household.insurance_price = value
+            elif name == "media_coverage": #the media keep this coverage instead of following the flood damage, None to follow it again
+                for media in self.agents_by_type["media"]:
+                    media.fixed_coverage = value
+                if value is not None:
+                    self.set_media_attention(value)
+            else:
+                raise ValueError(f"Unknown scenario parameter: '{name}'. "
+                                 f"Currently implemented scenario parameters are: {list(self.scenario_parameters)}")
+
+    @property
+    def G(self):
+        """The social network as a networkx graph, made from the adjacency of the household engine the first time it is used"""
+        if self._G is None:
+            self._G = to_networkx(self.household_engine.adjacency)
+        return self._G
+
+    @property
+    def depth_index(self):
+        """The DepthIndex of the flood map, opened the first time it is used (see get_depth_index)"""
+        if self._depth_index is None:
+            self._depth_index = get_depth_index(self.flood_map, self.band_flood_img, geodata.map_domain_polygon)
+        return self._depth_index
+
+    @property
+    def grid(self):
+        """NetworkGrid of the social network with the households on their node, made the first time it is used"""
+        if self._grid is None:
+            self._grid = NetworkGrid(self.G)
+            for household in self.agents_by_type["household"]:
+                self._grid.place_agent(agent=household, node_id=household.pos)
+        return self._grid
+
+    def apply_flood(self):
+        """
+        The actual flood depth and damage of all households in the zones with water in this step, for all zones at once.
+        The actual flood depth is the water level of the zone of the household plus its estimated flood depth.
+        """
+        engine = self.household_engine
+        zone = self.zone_index.update(engine.x, engine.y)
+        water_level = np.append(self.water_level, np.nan)[zone] #households in no zone (-1) get the nan at the end
+        households = np.flatnonzero(~np.isnan(water_level))
+        depths = water_level[households] + engine.flood_depth_estimated[households]
+        damages = self.damage_curve.damage(depths, engine.adaptation_number[households])
+        engine.flood_depth_actual[households] = depths
+        engine.flood_damage_actual[households] = damages
+        engine.active[households] = True
+        # the financial damage will be a chunk of the money the agent has with the idea that richer agents have more expensive things so hihger financial damage
+        self.household_damages += float((damages * engine.money[households]).sum())
+        engine.recount()
+
+    def add_agent(self, agent):
+        """Add an agent to the schedule and to the registry of its type"""
+        self.schedule.add(agent)
+        self.agents_by_type[agent.type].append(agent)
+
     def initialize_network(self):
         """
         Initialize and return the social network graph based on the provided network type using pattern matching.
+        Only used with network_backend='networkx', see network.py for the generators that are used by default.
         """
         if self.network == 'erdos_renyi':
             return nx.erdos_renyi_graph(n=self.number_of_households,
@@ -177,13 +393,7 @@ class AdaptationModel(Model):
         """
         Initialize and set up the flood map related data based on the provided flood map choice.
         """
-        # Define paths to flood maps
-        flood_map_paths = {
-            'harvey': r'../input_data/floodmaps/Harvey_depth_meters.tif',
-            '100yr': r'../input_data/floodmaps/100yr_storm_depth_meters.tif',
-            '500yr': r'../input_data/floodmaps/500yr_storm_depth_meters.tif',  # Example path for 500yr flood map
-            'Netherlands': r'../input_data/floodmaps/Netherlands.tif' 
-        }
+        flood_map_paths = self.flood_map_paths
 
         # Throw a ValueError if the flood map choice is not in the dictionary
         if flood_map_choice not in flood_map_paths.keys():
@@ -198,13 +408,20 @@ class AdaptationModel(Model):
         self.band_flood_img, self.bound_left, self.bound_right, self.bound_top, self.bound_bottom = get_flood_map_data(
             self.flood_map)
         
-        self.rain_values = get_rain_dict(self.number_of_steps, self.number_of_zones, self.bound_left, self.bound_right, self.bound_bottom, self.bound_top)
+        # the cells of the flood map in the model domain sorted by depth, only opened when relocation uses them (see depth_index)
+        self._depth_index = None
+        
+        self.rain_zones = get_rain_zones(self.number_of_zones, self.bound_left, self.bound_right, self.bound_bottom, self.bound_top)
+        self.rain_zones_y = get_rain_zones_y(self.number_of_zones_y, self.bound_bottom, self.bound_top)
+        self.rain_values = get_rain_values(self.number_of_steps, self.number_of_zones * self.number_of_zones_y, rng=self.streams.rain)
 
     def total_adapted_households(self):
-        """Return the total number of households that have adapted."""
-        #BE CAREFUL THAT YOU MAY HAVE DIFFERENT AGENT TYPES SO YOU NEED TO FIRST CHECK IF THE AGENT IS ACTUALLY A HOUSEHOLD AGENT USING "ISINSTANCE"
-        adapted_count = sum([1 for agent in self.schedule.agents if isinstance(agent, Households) and agent.is_adapted])
-        return adapted_count
+        """Return the total number of households that have adapted. The household engine keeps count"""
+        return self.household_engine.adapted_count
+
+    def total_insured_households(self):
+        """Return the total number of households that are insured."""
+        return self.household_engine.insured_count
     
     """Data collection variables"""
     def current_media_attention(self): #purely for data collection
@@ -218,11 +435,16 @@ class AdaptationModel(Model):
     
     def adapted_because_government_measures(self):
         return self.adapted_because_government
+
+    def count_adapted_because_government_measures(self):
+        return len(self.adapted_because_government)
     
     def get_total_household_damages(self):
         return self.household_damages
     
     def set_media_attention(self, val):
+        if val != self.media_coverage: #the media coverage is in the prospect theory score of every household
+            self.household_engine.active[:] = True
         self.media_coverage = val
     
     def set_current_policy(self, val):
@@ -237,12 +459,12 @@ class AdaptationModel(Model):
         """For plotting the map in the notebook"""
         fig, ax = plt.subplots()
         # Plot the model domain
-        map_domain_gdf.plot(ax=ax, color='lightgrey')
+        geodata.map_domain_gdf.plot(ax=ax, color='lightgrey')
         # Plot the floodplain
-        floodplain_gdf.plot(ax=ax, color='lightblue', edgecolor='k', alpha=0.5)
+        geodata.floodplain_gdf.plot(ax=ax, color='lightblue', edgecolor='k', alpha=0.5)
 
         # Collect agent locations and statuses
-        for agent in self.schedule.agents:
+        for agent in self.agents_by_type["household"]:
             color = 'blue' if agent.is_adapted else 'red'
             ax.scatter(agent.location.x, agent.location.y, color=color, s=10, label=color.capitalize() if not ax.collections else "")
             ax.annotate(str(agent.unique_id), (agent.location.x, agent.location.y), textcoords="offset points", xytext=(0,1), ha='center', fontsize=9)
@@ -257,27 +479,22 @@ class AdaptationModel(Model):
         plt.ylabel('Latitude')
         plt.show()
     
-    def decide_if_flood(self, rain_dict_key, government_implemetaitons): #rain dict key should be two x coordinate bounds
+    def zone_bounds(self, zone):
+        """x and y coordinate bounds of a zone (see ZoneIndex for the numbers of the zones)"""
+        return self.rain_zones[zone % self.number_of_zones], self.rain_zones_y[zone // self.number_of_zones]
+
+    def decide_if_flood(self, zone): #zone is the number of the zone (see ZoneIndex)
         """Decide whether there is a flood based on the CSV file of raindata in houston"""
-        rain_value = self.rain_values[rain_dict_key] #this is a list
-        rain_value = rain_value[self.schedule.steps]
-        #print(self.rain_values)
-        rain_dict_key_average = (rain_dict_key[0] + rain_dict_key[1])/2
-
-        for i in government_implemetaitons: #no flood in this zone because close to implementation
-            if i.policy == "Dikes":
-                diff_location = abs(rain_dict_key_average - i.location.x)
-                if diff_location < 100000: #
-                    if self.logging:
-                        f = open("logs/logs.txt", "a")
-                        f.write(f"no flood in zone {rain_dict_key} because of implementation\n")
-                        f.close()
-                    return False
-            elif i.policy == "Water Locks":
-                if diff_location < 150000: #
-                    return False
+        rain_value = self.rain_values[zone, self.schedule.steps]
+        zone_bounds = self.zone_bounds(zone) #two x and two y coordinate bounds
+        zone_average = (zone_bounds[0][0] + zone_bounds[0][1])/2 #dikes protect the zones in the x direction
+
+        if self.implementation_index.dike_near_zone(zone_average): #no flood in this zone because close to implementation
+            if self.logging:
+                self.run_log.record("info", "no_flood_because_of_implementation", self.schedule.steps, zone=zone, zone_bounds=zone_bounds)
+            return False
         if float(rain_value) > 3: #3000 mm for heavy rainfall as an assumptions
-            print(f"Flood in zone {rain_dict_key}", end='\r')
+            print(f"Flood in zone {zone_bounds}", end='\r')
             return True
         else:
             return False
@@ -298,31 +515,20 @@ class AdaptationModel(Model):
         The floods are devided into zones. The zones are now only on the x axis these still have to be expanded to the y axis 
         """
         flood = False
-        rain_dict_keys = self.rain_values.keys()
-        for i in rain_dict_keys:
-            rain_value = self.rain_values[i] #this is a list
-            rain_value = rain_value[self.schedule.steps]
+        self.water_level = np.full(len(self.rain_values), np.nan) #only the zones that flood in this step get water
+        for zone in range(len(self.rain_values)):
+            rain_value = self.rain_values[zone, self.schedule.steps]
             if self.schedule.steps != 0: #don't flood at the start of the model run
-                if self.decide_if_flood(rain_dict_key=i,government_implemetaitons=self.implementation_agents): #this flood will later be in one of the zones that will later be determined by the agent
+                if self.decide_if_flood(zone=zone): #this flood will later be in one of the zones that will later be determined by the agent
                     self.number_of_floods += 1
                     flood = True
                     water_level = self.base_water_level + float(rain_value) #this should be based on the location of the agent
-                    self.water_level[i] = water_level
+                    self.water_level[zone] = water_level
         
         if flood:
-            for agent in self.schedule.agents:
-                if agent.type == 'household':
-                    # Calculate the actual flood depth as a random number between 0.5 and 1.2 times the estimated flood depth
-                    for i in self.water_level:
-                        if i[0] <= agent.location.x <= i[1]:
-                            agent.flood_depth_actual = self.water_level[i] + agent.flood_depth_estimated #floodingdepth is random
-                            # calculate the actual flood damage given the actual flood depth
-                            agent.flood_damage_actual = calculate_basic_flood_damage(agent, agent.flood_depth_actual)
-                            
-                            flood_damage_financial = agent.flood_damage_actual * agent.money #the financial damage will be a chunk of the money the agent has with the idea that richer agents have more expensive things so hihger financial damage
-                            self.household_damages += flood_damage_financial
-                            flood = False
+            self.apply_flood()
                 
         # Collect data and advance the model by one step
         self.datacollector.collect(self)
+        self.household_engine.step() #bookkeeping of all households at once (only random draws if not vectorized)
         self.schedule.step()
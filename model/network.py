@@ -0,0 +1,140 @@
+"""
+Generators for the social network of the households that give the edges as numpy arrays, so no networkx graph has to be
+made for big numbers of households. The networks follow the same rules as the networkx generators with the same name,
+but they do not give the same graph for the same seed. Every edge is given once as (u[i], v[i]), nodes are 0 to n-1.
+"""
+import numpy as np
+import scipy.sparse as sp
+
+
+def edges_to_csr(number_of_nodes, u, v):
+    """Symmetric CSR adjacency matrix of the undirected edges (u, v), a node's friends are indices[indptr[i]:indptr[i+1]]"""
+    rows = np.concatenate([u, v])
+    cols = np.concatenate([v, u])
+    adjacency = sp.csr_array((np.ones(len(rows), dtype=np.int64), (rows, cols)), shape=(number_of_nodes, number_of_nodes))
+    adjacency.sum_duplicates()
+    adjacency.data[:] = 1
+    return adjacency
+
+def to_networkx(adjacency):
+    """networkx graph of a CSR adjacency matrix"""
+    import networkx as nx
+    return nx.from_scipy_sparse_array(adjacency)
+
+def edge_key(u, v, number_of_nodes):
+    """One number per undirected edge"""
+    return np.minimum(u, v).astype(np.int64) * number_of_nodes + np.maximum(u, v)
+
+def erdos_renyi_edges(number_of_nodes, p, rng):
+    """
+    Every pair of nodes is connected with probability p.
+    The number of edges is drawn from the binomial distribution and then that many different pairs are drawn, instead
+    of a random number for all n*(n-1)/2 pairs (that is only done for small networks).
+    """
+    number_of_pairs = number_of_nodes * (number_of_nodes - 1) // 2
+    if number_of_pairs <= 10**7:
+        pairs = np.flatnonzero(rng.random(number_of_pairs) < p)
+    else:
+        number_of_edges = rng.binomial(number_of_pairs, p)
+        pairs = np.unique(rng.integers(0, number_of_pairs, number_of_edges))
+        while len(pairs) < number_of_edges: #draw the pairs that were drawn twice again
+            extra = rng.integers(0, number_of_pairs, number_of_edges - len(pairs))
+            pairs = np.unique(np.concatenate([pairs, extra]))
+    # pair k is (i, j) with j < i and k = i*(i-1)/2 + j
+    u = ((1 + np.sqrt(1 + 8 * pairs.astype(float))) // 2).astype(np.int64)
+    u -= u * (u - 1) // 2 > pairs #correct rounding errors of the square root
+    u += (u + 1) * u // 2 <= pairs
+    v = pairs - u * (u - 1) // 2
+    return u, v
+
+def barabasi_albert_edges(number_of_nodes, m, rng):
+    """
+    Preferential attachment: a star of m+1 nodes and then every new node is connected to m different existing nodes,
+    chosen with a chance proportional to their degree (drawn from a list with every node repeated once per edge).
+    """
+    if m < 1 or m >= number_of_nodes:
+        raise ValueError(f"Barabási–Albert network must have m >= 1 and m < n, m = {m}, n = {number_of_nodes}")
+    number_of_edges = m + (number_of_nodes - m - 1) * m
+    u = np.empty(number_of_edges, dtype=np.int64)
+    v = np.empty(number_of_edges, dtype=np.int64)
+    u[:m] = 0
+    v[:m] = np.arange(1, m + 1)
+    repeated_nodes = np.empty(2 * number_of_edges, dtype=np.int64)
+    repeated_nodes[:m] = 0
+    repeated_nodes[m:2 * m] = np.arange(1, m + 1)
+    length = 2 * m
+    edge = m
+    draws = []
+    for source in range(m + 1, number_of_nodes):
+        targets = set()
+        while len(targets) < m:
+            if not draws:
+                draws = rng.random(4096).tolist() #drawn in blocks, a python float is faster to use than a numpy call
+            targets.add(int(repeated_nodes[int(draws.pop() * length)]))
+        targets = list(targets)
+        u[edge:edge + m] = source
+        v[edge:edge + m] = targets
+        edge += m
+        repeated_nodes[length:length + m] = targets
+        repeated_nodes[length + m:length + 2 * m] = source
+        length += 2 * m
+    return u, v
+
+def watts_strogatz_edges(number_of_nodes, k, p, rng, max_rounds=100):
+    """
+    Ring in which every node is connected to its k//2 nearest neighbours on both sides, after which every edge (u, v)
+    is rewired to (u, w) with probability p, with w a random node that is not u and not already a friend of u.
+    All edges are rewired at once, edges that gave a self loop or a double edge are drawn again.
+    """
+    if k > number_of_nodes:
+        raise ValueError("k>n, choose smaller k or larger n")
+    if k == number_of_nodes: #complete graph
+        return erdos_renyi_edges(number_of_nodes, 1.0, rng)
+    u = np.repeat(np.arange(number_of_nodes), k // 2)
+    v = (u + np.tile(np.arange(1, k // 2 + 1), number_of_nodes)) % number_of_nodes
+    rewire = rng.random(len(u)) < p
+    keys = edge_key(u[~rewire], v[~rewire], number_of_nodes)
+    pending = np.flatnonzero(rewire)
+    for _ in range(max_rounds): #max_rounds because a node that is connected to everyone can not be rewired
+        if not len(pending):
+            break
+        w = rng.integers(0, number_of_nodes, len(pending))
+        new_keys = edge_key(u[pending], w, number_of_nodes)
+        first = np.zeros(len(pending), dtype=bool)
+        first[np.unique(new_keys, return_index=True)[1]] = True
+        ok = first & (w != u[pending]) & ~np.isin(new_keys, keys)
+        v[pending[ok]] = w[ok]
+        keys = np.concatenate([keys, new_keys[ok]])
+        pending = pending[~ok]
+    # edges that could not be rewired keep their original node, if that is now a double edge edges_to_csr removes it
+    return u, v
+
+def generate_network(network, number_of_nodes, rng, number_of_nearest_neighbours=5, probability_of_network_connection=0.4, number_of_edges=3):
+    """
+    Edges of the social network as the arrays u and v, with the same network types and parameters as AdaptationModel.initialize_network
+
+    Parameters
+    ----------
+    network: "erdos_renyi", "barabasi_albert", "watts_strogatz" or "no_network"
+    number_of_nodes: number of households
+    rng: numpy Generator, e.g. np.random.default_rng(seed)
+    number_of_nearest_neighbours: mean degree of the erdos renyi network and k of the watts strogatz network
+    probability_of_network_connection: rewiring probability of the watts strogatz network
+    number_of_edges: m of the barabasi albert network
+
+    Returns
+    -------
+    u, v: arrays with the two nodes of every edge
+    """
+    if network == 'erdos_renyi':
+        return erdos_renyi_edges(number_of_nodes, number_of_nearest_neighbours / number_of_nodes, rng)
+    elif network == 'barabasi_albert':
+        return barabasi_albert_edges(number_of_nodes, number_of_edges, rng)
+    elif network == 'watts_strogatz':
+        return watts_strogatz_edges(number_of_nodes, number_of_nearest_neighbours, probability_of_network_connection, rng)
+    elif network == 'no_network':
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    else:
+        raise ValueError(f"Unknown network type: '{network}'. "
+                        f"Currently implemented network types are: "
+                        f"'erdos_renyi', 'barabasi_albert', 'watts_strogatz', and 'no_network'")
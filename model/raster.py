@@ -0,0 +1,250 @@
+# Importing necessary libraries
+import hashlib
+import math
+import os
+import numpy as np
+from shapely import contains_xy
+
+
+_flood_bands = {} #memory mapped bands per flood map file, shared by all models in a process
+
+def load_flood_band(flood_map):
+    """
+    The first band of the flood map as a read only memory mapped array.
+    The band is saved once as a .npy file next to the tif. After that every model, also in other processes, maps that
+    file, so the operating system keeps one copy of the pages that are used for all of them instead of every model
+    reading the whole band. If the .npy file can not be written the band is read into memory like before.
+    """
+    path = flood_map.name
+    if path not in _flood_bands:
+        cache_path = os.path.splitext(path)[0] + "_band1.npy"
+        if not (os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path)):
+            temporary_path = f"{cache_path}.{os.getpid()}.tmp" #written first so other processes never map half a file
+            try:
+                with open(temporary_path, "wb") as f:
+                    np.save(f, flood_map.read(1))
+                os.replace(temporary_path, cache_path)
+            except OSError:
+                return flood_map.read(1)
+        _flood_bands[path] = np.load(cache_path, mmap_mode='r')
+    return _flood_bands[path]
+
+
+
+class FloodDepthCache:
+    """
+    Cache that sits between the households and the flood map.
+    For every household the row and column in the flood map and the depth found there are kept, together with the
+    location they belong to. The flood map is only asked again for households whose location changed (after a move),
+    and then for all of these households in one call.
+    The depth is the value on the map, so it can be negative just like the result of get_flood_depth.
+    """
+    def __init__(self, corresponding_map, band, size):
+        self.corresponding_map = corresponding_map
+        self.band = band
+        self.x = np.full(size, np.nan) #nan is never equal to a location so every household is looked up the first time
+        self.y = np.full(size, np.nan)
+        self.rows = np.zeros(size, dtype=np.int64)
+        self.cols = np.zeros(size, dtype=np.int64)
+        self.depth = np.zeros(size)
+
+    def lookup(self, households, xs, ys):
+        """Look up the row, column and depth of the given households (row numbers in the engine) on the flood map"""
+        rows, cols = self.corresponding_map.index(xs, ys)
+        rows = np.abs(np.asarray(rows)) #same as get_flood_depth
+        cols = np.asarray(cols)
+        self.rows[households] = rows
+        self.cols[households] = cols
+        self.depth[households] = self.band[rows - 1, cols - 1]
+        self.x[households] = xs
+        self.y[households] = ys
+
+    def __getstate__(self):
+        """The flood map and band are left out when the model is pickled, AdaptationModel.__setstate__ puts them back"""
+        state = self.__dict__.copy()
+        state["corresponding_map"] = None
+        state["band"] = None
+        return state
+
+    def update(self, xs, ys):
+        """Refresh the households whose location is not the one in the cache, returns the depth of all households"""
+        changed = np.flatnonzero((xs != self.x) | (ys != self.y))
+        if len(changed):
+            self.lookup(changed, xs[changed], ys[changed])
+        return self.depth
+
+    def get_depth(self, household, x, y):
+        """Depth of one household, only looked up on the flood map if the household moved"""
+        if x != self.x[household] or y != self.y[household]:
+            self.lookup(np.array([household]), np.array([x]), np.array([y]))
+        return self.depth[household]
+
+    def cell(self, household):
+        """Number of the cell on the flood map the household is in, as one int"""
+        return int(self.rows[household]) * self.band.shape[1] + int(self.cols[household])
+
+
+_depth_indexes = {} #depth index per flood map file and model domain, shared by all models in a process
+
+def get_depth_index(flood_map, band, map_domain_polygon, tile_size=32):
+    """
+    The DepthIndex of the flood map and model domain. Like the band (see load_flood_band) the sorted cells are saved
+    once as .npy files next to the tif, after that every model, also in other processes, maps these files. If the
+    files can not be written the index is kept in memory. Within a process the index is only opened once.
+    """
+    domain = hashlib.sha1(map_domain_polygon.wkb).hexdigest()[:16] #another model domain gets other files
+    key = (flood_map.name, domain, tile_size)
+    if key in _depth_indexes:
+        return _depth_indexes[key]
+    depth_index = DepthIndex(flood_map.transform, band.shape, tile_size)
+    path = flood_map.name
+    prefix = os.path.splitext(path)[0] + f"_depth_index_{domain}_{tile_size}_"
+    cache_paths = {name: f"{prefix}{name}.npy" for name in DepthIndex.array_names}
+    if not all(os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path) for cache_path in cache_paths.values()):
+        depth_index.build(band, map_domain_polygon)
+        try:
+            for name, cache_path in cache_paths.items():
+                temporary_path = f"{cache_path}.{os.getpid()}.tmp" #written first so other processes never map half a file
+                with open(temporary_path, "wb") as f:
+                    np.save(f, getattr(depth_index, name))
+                os.replace(temporary_path, cache_path)
+        except OSError:
+            _depth_indexes[key] = depth_index
+            return depth_index
+    for name, cache_path in cache_paths.items():
+        setattr(depth_index, name, np.load(cache_path, mmap_mode='r'))
+    _depth_indexes[key] = depth_index
+    return depth_index
+
+
+class DepthIndex:
+    """
+    The cells of the flood map within the model domain, sorted by their depth, to find low and high locations without
+    looking up random points on the flood map. Made with get_depth_index, which saves the sorted cells next to the tif.
+
+    A household at (x, y) gets the depth band[row - 1, col - 1] where row, col is the cell (x, y) is in (see
+    get_flood_depth), so the location of the depth in band[i, j] is the centre of the cell one row and one column
+    further. Only cells whose location is in the model domain are kept. The cells are kept twice: once sorted by
+    depth for the whole map, and once per tile (a square of tile_size x tile_size cells) sorted by depth, to find the
+    cells close to a location. The lowest depth is the location least flooded.
+    """
+    array_names = ("cells", "depth", "tile_cells", "tile_depth", "tile_start")
+
+    def __init__(self, transform, shape, tile_size=32):
+        self.transform = transform
+        self.number_of_rows, self.number_of_columns = shape
+        self.tile_size = tile_size
+        self.number_of_tile_columns = -(-self.number_of_columns // tile_size)
+        self.number_of_tile_rows = -(-self.number_of_rows // tile_size)
+        self.tile_counts = {}
+
+    def build(self, band, map_domain_polygon, block_rows=64):
+        """Find the cells in the model domain and sort them, the whole map is read once"""
+        cells = []
+        for start in range(0, self.number_of_rows, block_rows): #a block of rows at a time so the coordinates of the whole map are never in memory
+            rows, cols = np.divmod(np.arange(start * self.number_of_columns, min(start + block_rows, self.number_of_rows) * self.number_of_columns), self.number_of_columns)
+            inside = contains_xy(map_domain_polygon, *self.cell_locations(rows, cols))
+            cells.append(rows[inside] * self.number_of_columns + cols[inside])
+        cells = np.concatenate(cells)
+        depth = np.asarray(band).ravel()[cells]
+        order = np.argsort(depth, kind='stable')
+        self.cells = cells[order] #all cells from low to high depth
+        self.depth = depth[order]
+
+        tile = self.tile(*np.divmod(self.cells, self.number_of_columns))
+        order = np.argsort(tile, kind='stable') #stays sorted by depth within a tile
+        self.tile_cells = self.cells[order]
+        self.tile_depth = self.depth[order]
+        self.tile_start = np.searchsorted(tile[order], np.arange(self.number_of_tile_rows * self.number_of_tile_columns + 1))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def tile(self, rows, cols):
+        return (rows // self.tile_size) * self.number_of_tile_columns + cols // self.tile_size
+
+    def cell_locations(self, rows, cols):
+        """x and y of the locations that get the depth of band[rows, cols]"""
+        a, b, c, d, e, f = self.transform[:6]
+        return c + (cols + 1.5) * a, f + (rows + 1.5) * e
+
+    def locations(self, cells):
+        """x and y of the locations of cells (row * number of columns + column in the band)"""
+        return self.cell_locations(*np.divmod(cells, self.number_of_columns))
+
+    def lowest(self, number):
+        """Locations of the number cells with the lowest depth as arrays x, y"""
+        return self.locations(self.cells[:number])
+
+    def highest(self, number):
+        """Locations of the number cells with the highest depth as arrays x, y, highest first"""
+        return self.locations(self.cells[::-1][:number])
+
+    def lowest_of_sample(self, sample_size, number, rng):
+        """
+        The number lowest of sample_size random cells, lowest first. The cells are sorted by depth so this only needs
+        the sample_size random positions in the sorted cells and the smallest of them.
+        """
+        positions = np.sort(rng.integers(len(self.cells), size=sample_size))
+        return self.locations(self.cells[positions[:number]])
+
+    def sample_below(self, depth, rng, size=None):
+        """Locations of size random cells (one if size is None) with a depth below depth, None if there are none"""
+        end = np.searchsorted(self.depth, depth)
+        if end == 0:
+            return None
+        return self.locations(self.cells[rng.integers(end, size=size)])
+
+    def counts_below(self, depth):
+        """Number of cells with a depth below depth in every tile, as a grid of tiles. Kept for every depth that was asked"""
+        if depth not in self.tile_counts:
+            tile = np.repeat(np.arange(len(self.tile_start) - 1), np.diff(self.tile_start))
+            counts = np.bincount(tile[self.tile_depth < depth], minlength=len(self.tile_start) - 1)
+            self.tile_counts[depth] = counts.reshape(-1, self.number_of_tile_columns)
+        return self.tile_counts[depth]
+
+    def tiles_near(self, x, y, radius, depth):
+        """The tiles that can have a location at most radius from (x, y) as the start of their cells and the number of them with a depth below depth"""
+        a, b, c, d, e, f = self.transform[:6]
+        # band rows and columns of the locations in the square around (x, y)
+        col_min, col_max = sorted(((x - radius - c) / a - 1.5, (x + radius - c) / a - 1.5))
+        row_min, row_max = sorted(((y - radius - f) / e - 1.5, (y + radius - f) / e - 1.5))
+        counts = self.counts_below(depth)
+        tile_rows = slice(max(math.floor(row_min), 0) // self.tile_size, max(min(math.ceil(row_max), self.number_of_rows - 1) // self.tile_size + 1, 0))
+        tile_cols = slice(max(math.floor(col_min), 0) // self.tile_size, max(min(math.ceil(col_max), self.number_of_columns - 1) // self.tile_size + 1, 0))
+        starts = self.tile_start[:-1].reshape(counts.shape)[tile_rows, tile_cols].ravel()
+        return starts, counts[tile_rows, tile_cols].ravel()
+
+    def near_below(self, x, y, radius, depth):
+        """Locations of the cells with a depth below depth whose location is at most radius from (x, y), as arrays x, y"""
+        starts, counts = self.tiles_near(x, y, radius, depth)
+        # the cells of a tile are sorted by depth, so the ones below depth are the first counts cells
+        cells = self.tile_cells[np.repeat(starts, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)]
+        xs, ys = self.locations(cells)
+        near = (xs - x)**2 + (ys - y)**2 <= radius**2
+        return xs[near], ys[near]
+
+    def sample_near_below(self, x, y, radius, depth, rng, tries=8):
+        """
+        A random location (x, y) of a cell with a depth below depth at most radius from (x, y), of a random cell with
+        a depth below depth anywhere if there is none close, None if there is no such cell at all.
+        Random cells below depth of the tiles around (x, y) are drawn until one is close enough, only after tries
+        draws all the close cells are searched.
+        """
+        starts, counts = self.tiles_near(x, y, radius, depth)
+        total = counts.sum()
+        if total:
+            ends = np.cumsum(counts)
+            for i in rng.integers(total, size=tries).tolist():
+                tile = np.searchsorted(ends, i, side='right')
+                cell_x, cell_y = self.locations(self.tile_cells[starts[tile] + i - (ends[tile] - counts[tile])])
+                if (cell_x - x)**2 + (cell_y - y)**2 <= radius**2:
+                    return float(cell_x), float(cell_y)
+            xs, ys = self.near_below(x, y, radius, depth)
+            if len(xs):
+                i = rng.integers(len(xs))
+                return float(xs[i]), float(ys[i])
+        location = self.sample_below(depth, rng)
+        if location is None:
+            return None
+        return float(location[0]), float(location[1])
@@ -0,0 +1,92 @@
+# Importing necessary libraries
+import atexit
+import itertools
+import json
+import os
+import threading
+import time
+import numpy as np
+
+
+_run_numbers = itertools.count() #so two models started in the same millisecond in one process get their own file
+
+def json_default(value):
+    """numpy numbers (and anything else json does not know) in a record"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class RunLog:
+    """
+    Log of one model run, written as one JSON object per line to its own file in log_dir.
+
+    record() only puts the record in a list in memory, a background thread writes the list to the file every
+    flush_interval seconds or as soon as batch_size records are waiting. So the agents do not open the file for every
+    message and runs in parallel never write to the same file.
+
+    Records below level are not kept. Of the records with level debug only a share sample_rate is kept, drawn with rng
+    (the logging stream of the model) so the same seed keeps the same records, a new unseeded one if None.
+    Call close() when the run is done (AdaptationModel.close does that), it stops the thread and closes the file.
+    """
+    levels = {"debug": 10, "info": 20, "warning": 30}
+
+    def __init__(self, log_dir, name, level="info", sample_rate=1.0, rng=None, batch_size=1000, flush_interval=1.0):
+        if level not in self.levels:
+            raise ValueError(f"Unknown log level: '{level}'. Currently implemented levels are: {list(self.levels)}")
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = os.path.join(log_dir, f"{name}_{os.getpid()}_{int(time.time() * 1000)}_{next(_run_numbers)}.jsonl")
+        self.level = self.levels[level]
+        self.sample_rate = sample_rate
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.closed = False
+        self.file = open(self.path, "a")
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close) #the records that are still waiting are written when python stops
+
+    def record(self, level, event, step, **fields):
+        """Keep a record of an event in step, fields are the values that are written with it"""
+        level_number = self.levels[level]
+        if level_number < self.level or self.closed:
+            return
+        if level_number == self.levels["debug"] and self.sample_rate < 1 and self.rng.random() >= self.sample_rate:
+            return
+        fields["step"] = step
+        fields["level"] = level
+        fields["event"] = event
+        with self.lock:
+            self.buffer.append(fields)
+            full = len(self.buffer) >= self.batch_size
+        if full:
+            self.wake.set()
+
+    def write(self):
+        """Write all records that are waiting to the file"""
+        with self.lock:
+            records, self.buffer = self.buffer, []
+        if records:
+            self.file.write("".join(json.dumps(record, default=json_default) + "\n" for record in records))
+            self.file.flush()
+
+    def run(self):
+        while not self.closed:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            self.write()
+
+    def close(self):
+        """Stop the background thread and write the last records"""
+        if self.closed:
+            return
+        self.closed = True
+        self.wake.set()
+        self.thread.join()
+        self.write()
+        self.file.close()
+        atexit.unregister(self.close)
@@ -0,0 +1,168 @@
+# Importing necessary libraries
+import bisect
+import math
+from collections import defaultdict
+import numpy as np
+
+
+class ImplementationIndex:
+    """
+    Spatial index of the government implementations, per policy a grid of buckets as big as the area the policy protects.
+    For every household it also remembers whether it is protected by an implementation. This is only looked up again
+    when the household moved, and when an implementation is added the households it protects are updated at once.
+    """
+    # half the width of the square around an implementation in which households are protected
+    protection_range = {
+        "Dikes": 8000,
+        "Water locks": 16000 #water locks offer double the protection
+    }
+    zone_protection_range = 100000 #a dike closer than this to the middle of a rain zone prevents a flood in that zone
+
+    def __init__(self, size):
+        self.buckets = {policy: defaultdict(list) for policy in self.protection_range}
+        self.dikes_x = [] #sorted x coordinates of the dikes
+        self.x = np.full(size, np.nan) #location the protection was looked up for, nan means not looked up yet
+        self.y = np.full(size, np.nan)
+        self.protected = np.zeros(size, dtype=bool)
+
+    def add(self, implementation):
+        """Put a new implementation in the index and protect the households around it, returns the rows of the households that were not protected before"""
+        policy = implementation.policy
+        if policy not in self.protection_range:
+            return np.zeros(0, dtype=np.int64)
+        reach = self.protection_range[policy]
+        x = implementation.location.x
+        y = implementation.location.y
+        self.buckets[policy][(math.floor(x / reach), math.floor(y / reach))].append(implementation)
+        if policy == "Dikes":
+            bisect.insort(self.dikes_x, x)
+        near = (np.abs(self.x - x) < reach) & (np.abs(self.y - y) < reach) #nan compares as False
+        newly_protected = np.flatnonzero(near & ~self.protected)
+        self.protected |= near
+        return newly_protected
+
+    def query(self, x, y):
+        """Whether there is an implementation that protects the location (x, y)"""
+        for policy, reach in self.protection_range.items():
+            buckets = self.buckets[policy]
+            if not buckets:
+                continue
+            cell_x = math.floor(x / reach)
+            cell_y = math.floor(y / reach)
+            for i in (cell_x - 1, cell_x, cell_x + 1):
+                for j in (cell_y - 1, cell_y, cell_y + 1):
+                    for implementation in buckets.get((i, j), ()):
+                        if abs(x - implementation.location.x) < reach and abs(y - implementation.location.y) < reach:
+                            return True
+        return False
+
+    def is_protected(self, household, x, y):
+        """Whether the household (row in the engine) at (x, y) is protected, only searched again if it moved"""
+        if x != self.x[household] or y != self.y[household]:
+            self.protected[household] = self.query(x, y)
+            self.x[household] = x
+            self.y[household] = y
+        return self.protected[household]
+
+    def dike_near_zone(self, zone_middle_x):
+        """Whether there is a dike whose x coordinate is closer than zone_protection_range to the middle of a zone"""
+        i = bisect.bisect_right(self.dikes_x, zone_middle_x - self.zone_protection_range)
+        return i < len(self.dikes_x) and self.dikes_x[i] < zone_middle_x + self.zone_protection_range
+
+
+class HeightLocationStore:
+    """
+    The locations where households found a low flood depth, households that move pick one of these.
+    Locations are kept once per cell of the flood map (the key), with the coordinates of the first household seen there.
+    When the store is full a new cell replaces a random stored one with reservoir sampling, so the stored cells stay
+    a uniform sample of the cells that were offered and the memory use does not grow with the number of steps.
+    A cell that was replaced can be counted again when it is offered later.
+    rng is the numpy random Generator used for the replacements and the samples, a new unseeded one if None.
+    """
+    def __init__(self, capacity=10000, rng=None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.xy = np.empty((capacity, 2))
+        self.keys = np.empty(capacity, dtype=np.int64)
+        self.slots = {} #key to its position in the buffers
+        self.size = 0
+        self.seen = 0 #number of different cells offered
+
+    def __len__(self):
+        return self.size
+
+    def add(self, key, x, y):
+        """Offer the location (x, y) of cell key"""
+        if key in self.slots:
+            return
+        self.seen += 1
+        if self.size < self.capacity:
+            slot = self.size
+            self.size += 1
+        else:
+            slot = int(self.rng.integers(self.seen))
+            if slot >= self.capacity:
+                return
+            del self.slots[int(self.keys[slot])]
+        self.slots[key] = slot
+        self.keys[slot] = key
+        self.xy[slot] = x, y
+
+    def add_many(self, keys, xs, ys):
+        """
+        Offer many locations at once, like calling add for every one of them in this order, except that a cell that
+        is in keys more than once is only offered the first time. Only the cells that are not stored yet are added one
+        by one, which after the first steps are only a few.
+        """
+        keys, first = np.unique(keys, return_index=True)
+        order = np.argsort(first)
+        keys = keys[order]
+        first = first[order]
+        new = ~np.isin(keys, self.keys[:self.size])
+        for key, x, y in zip(keys[new].tolist(), xs[first[new]].tolist(), ys[first[new]].tolist()):
+            self.add(key, x, y)
+
+    def sample(self):
+        """A random stored location as x, y"""
+        x, y = self.xy[self.rng.integers(self.size)]
+        return x, y
+
+    def sample_many(self, number):
+        """number random stored locations as arrays x, y"""
+        xy = self.xy[self.rng.integers(self.size, size=number)]
+        return xy[:, 0], xy[:, 1]
+
+
+class ZoneIndex:
+    """
+    The rain zone every household is in. The zones are a grid of columns (the x bounds of get_rain_zones, from left to
+    right) and rows (the y bounds of get_rain_zones_y), zone number = row * number of columns + column.
+    Households outside the x bounds of all zones are in no zone (-1). In the y direction the first and last row go on
+    to the edge of the map, so with one row the y coordinate does not matter. A household on the border of two zones
+    is in the zone to the right or top of it. Like the FloodDepthCache the zone is only looked up again for the
+    households that moved.
+    """
+    def __init__(self, x_bounds, y_bounds, size):
+        self.x_edges = np.array([x_bounds[0][0]] + [bounds[1] for bounds in x_bounds])
+        self.y_edges = np.array([y_bounds[0][0]] + [bounds[1] for bounds in y_bounds])
+        self.number_of_columns = len(x_bounds)
+        self.number_of_rows = len(y_bounds)
+        self.x = np.full(size, np.nan) #nan is never equal to a location so every household is looked up the first time
+        self.y = np.full(size, np.nan)
+        self.zone = np.full(size, -1, dtype=np.int64)
+
+    def lookup(self, xs, ys):
+        """Zone numbers of the locations (xs, ys)"""
+        column = np.searchsorted(self.x_edges, xs, side='right') - 1
+        column[xs == self.x_edges[-1]] = self.number_of_columns - 1 #the right bound still belongs to the last zone
+        row = np.clip(np.searchsorted(self.y_edges, ys, side='right') - 1, 0, self.number_of_rows - 1)
+        return np.where((column >= 0) & (column < self.number_of_columns), row * self.number_of_columns + column, -1)
+
+    def update(self, xs, ys):
+        """Look up the households whose location is not the one in the index, returns the zone of all households"""
+        changed = np.flatnonzero((xs != self.x) | (ys != self.y))
+        if len(changed):
+            self.zone[changed] = self.lookup(xs[changed], ys[changed])
+            self.x[changed] = xs[changed]
+            self.y[changed] = ys[changed]
+        return self.zone
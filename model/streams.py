@@ -0,0 +1,30 @@
+# Importing necessary libraries
+import numpy as np
+
+
+class RandomStreams:
+    """
+    The random number generators of one model, one independent numpy Generator per part of the model.
+    All of them come from one SeedSequence, so a model with the same seed always draws the same numbers, also when
+    other models run at the same time in the same process or in other processes, and a change to how many numbers
+    one part draws does not change the numbers of the other parts.
+
+    New streams have to be added at the end of names, so the existing streams keep their numbers.
+    """
+    names = (
+        "network",          # social network (network.py)
+        "locations",        # starting locations of the households
+        "households",       # starting money, income, risk behavior and insurance benefit of the households
+        "step",             # numbers the households use in a step, drawn for all of them at the start of the step
+        "rain",             # rain values of the zones
+        "government",       # other expenses and incomes of the government and the low locations for its implementations
+        "moves",            # where households move to
+        "height_locations", # which high locations are remembered for households that move
+        "logging"           # which debug records are kept when only a sample is logged (see RunLog)
+    )
+
+    def __init__(self, seed=None):
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.entropy = self.seed_sequence.entropy #with this as seed the run can be done again when seed was None
+        for name, child in zip(self.names, self.seed_sequence.spawn(len(self.names))):
+            setattr(self, name, np.random.Generator(np.random.PCG64(child)))
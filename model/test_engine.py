@@ -0,0 +1,43 @@
+"""
+Checks of the vectorized HouseholdEngine against the scalar path, run from this directory with python -m pytest
+(the model reads its input data from ../input_data)
+"""
+import warnings
+import numpy as np
+import pytest
+
+from model import AdaptationModel
+
+columns = ["money", "is_adapted", "is_insured", "moved", "x", "y", "step_adapted", "flood_depth_actual"]
+
+
+def run(vectorized, seed, number_of_steps=20, **params):
+    """The household columns of the engine after every step"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = AdaptationModel(seed=seed, number_of_households=300, number_of_steps=number_of_steps, vectorized=vectorized, **params)
+        states = []
+        for _ in range(number_of_steps):
+            model.step()
+            states.append({column: getattr(model.household_engine, column).copy() for column in columns})
+    return states
+
+
+@pytest.mark.parametrize("seed", [3, 4, 5])
+@pytest.mark.parametrize("params", [{}, {"number_of_zones": 4, "base_water_level": 2}, {"relocation": "height_locations"}])
+def test_vectorized_same_as_scalar_without_insurance(seed, params):
+    """Without insurance (and inequality) nothing a household reads changes within a step, so both modes give the same households"""
+    scalar = run(False, seed, insurance=False, **params)
+    vectorized = run(True, seed, insurance=False, **params)
+    for step, (expected, actual) in enumerate(zip(scalar, vectorized)):
+        for column in columns:
+            np.testing.assert_allclose(actual[column], expected[column], err_msg=f"{column} differs in step {step}")
+
+
+def test_numexpr_same_as_numpy():
+    """The prospect theory scores of numexpr give the same households, without numexpr use_numexpr falls back to numpy"""
+    numpy = run(True, 3, number_of_steps=10)
+    numexpr = run(True, 3, number_of_steps=10, use_numexpr=True)
+    for step, (expected, actual) in enumerate(zip(numpy, numexpr)):
+        for column in columns:
+            np.testing.assert_allclose(actual[column], expected[column], err_msg=f"{column} differs in step {step}")